@@ -1,14 +1,50 @@
 # app.py
+import base64
+import click
+import codecs
+import csv
+import hashlib
+import io
+import json
+import math
 import os
+import re
+import select
+import threading
+import time
+import uuid
+from itertools import groupby
 import psycopg2
 import psycopg2.extras
-from flask import Flask, Blueprint, request, jsonify
+import psycopg2.pool
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from flask import Flask, Blueprint, Response, request, jsonify, g, make_response, has_request_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from functools import wraps
+from codes import KEY_TIERS, code_keys
 
 # Helper Functions
 DATABASE_URL = os.environ.get("DATABASE_URL")
 API_KEY = os.environ.get("API_KEY")
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", "10"))
+DB_POOL_IDLE_TIMEOUT = float(os.environ.get("DB_POOL_IDLE_TIMEOUT", "300"))
+DB_POOL_CHECKOUT_TIMEOUT = float(os.environ.get("DB_POOL_CHECKOUT_TIMEOUT", "30"))
+DB_POOL_HEALTH_CHECK = os.environ.get("DB_POOL_HEALTH_CHECK", "1") == "1"
+LOOKUP_CACHE_SIZE = int(os.environ.get("LOOKUP_CACHE_SIZE", "5000"))
+LOOKUP_CACHE_TTL = float(os.environ.get("LOOKUP_CACHE_TTL", "300"))
+LOOKUP_CACHE_MAX_AGE = int(os.environ.get("LOOKUP_CACHE_MAX_AGE", "0"))
+LOOKUP_CACHE_MAX_BYTES = int(os.environ.get("LOOKUP_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+LOOKUP_CACHE_MAX_ENTRY_BYTES = int(os.environ.get("LOOKUP_CACHE_MAX_ENTRY_BYTES", str(256 * 1024)))
+LOOKUP_BATCH_MAX = int(os.environ.get("LOOKUP_BATCH_MAX", "1000"))
+REQUEST_TIMING = os.environ.get("REQUEST_TIMING") == "1"
+REQUEST_TIMING_SAMPLES = int(os.environ.get("REQUEST_TIMING_SAMPLES", "2048"))
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "0"))
+JOB_CHUNK_SIZE = int(os.environ.get("JOB_CHUNK_SIZE", "1000"))
+JOB_LEASE_SECONDS = int(os.environ.get("JOB_LEASE_SECONDS", "300"))
+JOB_POLL_SECONDS = float(os.environ.get("JOB_POLL_SECONDS", "5"))
 
 def require_api_key(f):
     @wraps(f)
@@ -22,7 +58,326 @@ def require_api_key(f):
 def get_db_connection():
     if not DATABASE_URL:
         raise ValueError("DATABASE_URL not set")
-    return psycopg2.connect(DATABASE_URL)
+    conn = psycopg2.connect(DATABASE_URL, cursor_factory=DB_CURSOR)
+    try:
+        check_schema(conn)
+    except Exception:
+        conn.close()
+        raise
+    return conn
+
+# Connection Pool
+class ConnectionPool:
+    """Per-process pool of database connections.
+
+    Checkout blocks up to checkout_timeout when max_size connections are in use.
+    Idle connections past idle_timeout are closed (down to min_size), and with
+    health_check enabled each checkout is verified with SELECT 1.
+    """
+
+    def __init__(self, min_size, max_size, idle_timeout, checkout_timeout, health_check):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.health_check = health_check
+
+        self._idle = []
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+        self.created = 0
+        self.closed = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+        for _ in range(min_size):
+            self._idle.append((self._open(), time.monotonic()))
+
+    def _open(self):
+        conn = get_db_connection()
+        with self._cond:
+            self.created += 1
+        return conn
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        with self._cond:
+            self.closed += 1
+
+    def _is_healthy(self, conn):
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        start = time.monotonic()
+        deadline = start + self.checkout_timeout
+        stale = []
+        conn = None
+        blocked = False
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                while len(self._idle) > self.min_size and now - self._idle[0][1] > self.idle_timeout:
+                    stale.append(self._idle.pop(0)[0])
+
+                if self._idle:
+                    conn = self._idle.pop()[0]
+                    break
+                if self._in_use + len(self._idle) < self.max_size:
+                    break
+
+                remaining = deadline - now
+                if remaining <= 0:
+                    raise psycopg2.pool.PoolError("Timed out waiting for a database connection.")
+                blocked = True
+                self._cond.wait(remaining)
+
+            self._in_use += 1
+            self.checkouts += 1
+            if blocked:
+                waited = time.monotonic() - start
+                self.waits += 1
+                self.wait_time_total += waited
+                self.wait_time_max = max(self.wait_time_max, waited)
+
+        for stale_conn in stale:
+            self._close(stale_conn)
+
+        try:
+            if conn is not None and self.health_check and not self._is_healthy(conn):
+                self._close(conn)
+                conn = None
+            if conn is None:
+                conn = self._open()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def putconn(self, conn, discard=False):
+        if not discard and not conn.closed:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                discard = True
+
+        if discard or conn.closed:
+            self._close(conn)
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            return
+
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "created": self.created,
+                "closed": self.closed,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "wait_time_total_ms": round(self.wait_time_total * 1000, 3),
+                "wait_time_max_ms": round(self.wait_time_max * 1000, 3),
+            }
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    # Gunicorn forks workers after import, so each process builds its own pool.
+    # Connections inherited from a parent are abandoned, never closed, because
+    # closing them would end the parent's sessions.
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ConnectionPool(
+                    DB_POOL_MIN,
+                    DB_POOL_MAX,
+                    DB_POOL_IDLE_TIMEOUT,
+                    DB_POOL_CHECKOUT_TIMEOUT,
+                    DB_POOL_HEALTH_CHECK
+                )
+                _pool_pid = os.getpid()
+    return _pool
+
+@contextmanager
+def db_connection():
+    """Check a connection out of the pool; it is rolled back and returned on exit."""
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+    finally:
+        pool.putconn(conn)
+
+# Request Timing
+# Opt-in with REQUEST_TIMING=1. Database time and rows fetched are collected by the
+# cursor classes, serialization time by the JSON provider. Each response gets a
+# Server-Timing header and per-endpoint percentiles are reported by /api/metrics.
+# Work done outside a request (import jobs, streamed response bodies) is not counted.
+def record_timing(phase, seconds, rows=0):
+    if not REQUEST_TIMING or not has_request_context() or "timing" not in g:
+        return
+    g.timing[phase] += seconds
+    g.timing_rows += rows
+
+class TimedCursorMixin:
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            record_timing("db", time.perf_counter() - start)
+
+    def executemany(self, query, vars_list):
+        start = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            record_timing("db", time.perf_counter() - start)
+
+    def copy_expert(self, sql, file, size=8192):
+        start = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            record_timing("db", time.perf_counter() - start)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        record_timing("db", time.perf_counter() - start, 1 if row is not None else 0)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(size) if size is not None else super().fetchmany()
+        record_timing("db", time.perf_counter() - start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        record_timing("db", time.perf_counter() - start, len(rows))
+        return rows
+
+    def __iter__(self):
+        rows = super().__iter__()
+        while True:
+            start = time.perf_counter()
+            try:
+                row = next(rows)
+            except StopIteration:
+                record_timing("db", time.perf_counter() - start)
+                return
+            record_timing("db", time.perf_counter() - start, 1)
+            yield row
+
+class TimedCursor(TimedCursorMixin, psycopg2.extensions.cursor):
+    pass
+
+class TimedRealDictCursor(TimedCursorMixin, psycopg2.extras.RealDictCursor):
+    pass
+
+# With timing off, connections and handlers use the plain cursor classes.
+DB_CURSOR = TimedCursor if REQUEST_TIMING else psycopg2.extensions.cursor
+DICT_CURSOR = TimedRealDictCursor if REQUEST_TIMING else psycopg2.extras.RealDictCursor
+
+class TimedJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            record_timing("serialize", time.perf_counter() - start)
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    # Nearest-rank percentile.
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+class TimingStats:
+    """Per-endpoint request counts and a bounded window of recent timings (ms)."""
+
+    PHASES = ("total", "db", "serialize")
+
+    def __init__(self, samples):
+        self.samples = samples
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, timings, rows):
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = {"count": 0, "rows": 0, "windows": {phase: deque(maxlen=self.samples) for phase in self.PHASES}}
+                self._endpoints[endpoint] = stats
+            stats["count"] += 1
+            stats["rows"] += rows
+            for phase in self.PHASES:
+                stats["windows"][phase].append(timings[phase] * 1000)
+
+    def stats(self):
+        with self._lock:
+            report = {}
+            for endpoint, stats in self._endpoints.items():
+                report[endpoint] = {"count": stats["count"], "rows": stats["rows"]}
+                for phase, window in stats["windows"].items():
+                    values = sorted(window)
+                    report[endpoint][phase] = {
+                        "mean_ms": round(sum(values) / len(values), 3) if values else None,
+                        "p50_ms": percentile(values, 50),
+                        "p95_ms": percentile(values, 95),
+                        "p99_ms": percentile(values, 99),
+                    }
+            return report
+
+request_timing = TimingStats(REQUEST_TIMING_SAMPLES)
+
+def start_request_timing():
+    if REQUEST_TIMING:
+        g.timing = {"db": 0.0, "serialize": 0.0}
+        g.timing_rows = 0
+        g.timing_start = time.perf_counter()
+
+def finish_request_timing(response):
+    if not REQUEST_TIMING or "timing" not in g:
+        return response
+    timings = dict(g.timing, total=time.perf_counter() - g.timing_start)
+    request_timing.record(request.endpoint or "unmatched", timings, g.timing_rows)
+    response.headers["Server-Timing"] = ", ".join([
+        f'db;dur={timings["db"] * 1000:.2f};desc="{g.timing_rows} rows"',
+        f'serialize;dur={timings["serialize"] * 1000:.2f}',
+        f'total;dur={timings["total"] * 1000:.2f}',
+    ])
+    return response
 
 def empty_to_none(value):
     if value is None:
@@ -34,6 +389,566 @@ def handle_db_error(e):
     print(f"Database error: {e}")
     return jsonify({"status": "error", "message": "A database error occurred.", "error": str(e)}), 500
 
+# Schema
+# Derived objects the app maintains itself; products and inventory are managed externally.
+# Migrations are applied out of band with `flask --app app migrate`, never on the request
+# path. Each entry runs once, in order: (description, statements, transactional).
+# Non-transactional entries run statement by statement in autocommit mode so they
+# can use CREATE INDEX CONCURRENTLY; if one fails, drop the INVALID index it left
+# behind before re-running migrate.
+MIGRATIONS = [
+    ("code index and import jobs", [
+        """
+        CREATE TABLE IF NOT EXISTS product_codes (
+            code_key TEXT NOT NULL,
+            system_id TEXT NOT NULL,
+            source TEXT NOT NULL,
+            PRIMARY KEY (code_key, system_id, source)
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS product_codes_system_id_idx ON product_codes (system_id);",
+        """
+        CREATE TABLE IF NOT EXISTS import_jobs (
+            id BIGSERIAL PRIMARY KEY,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            total_rows INTEGER NOT NULL DEFAULT 0,
+            next_row INTEGER NOT NULL DEFAULT 0,
+            processed_rows INTEGER NOT NULL DEFAULT 0,
+            error_count INTEGER NOT NULL DEFAULT 0,
+            message TEXT,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            started_at TIMESTAMPTZ,
+            finished_at TIMESTAMPTZ,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS import_job_rows (
+            job_id BIGINT NOT NULL REFERENCES import_jobs (id) ON DELETE CASCADE,
+            row_idx INTEGER NOT NULL,
+            line INTEGER,
+            data JSONB,
+            PRIMARY KEY (job_id, row_idx)
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS import_job_errors (
+            job_id BIGINT NOT NULL REFERENCES import_jobs (id) ON DELETE CASCADE,
+            row_idx INTEGER NOT NULL,
+            line INTEGER,
+            message TEXT NOT NULL
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS import_job_errors_job_idx ON import_job_errors (job_id, row_idx);",
+        """
+        ALTER TABLE import_jobs
+            ADD COLUMN IF NOT EXISTS snapshot BOOLEAN NOT NULL DEFAULT false,
+            ADD COLUMN IF NOT EXISTS inserted_rows INTEGER NOT NULL DEFAULT 0,
+            ADD COLUMN IF NOT EXISTS updated_rows INTEGER NOT NULL DEFAULT 0,
+            ADD COLUMN IF NOT EXISTS unchanged_rows INTEGER NOT NULL DEFAULT 0,
+            ADD COLUMN IF NOT EXISTS missing JSONB;
+        """,
+    ], True),
+    ("search indexes", [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm;",
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS products_search_trgm_gist_idx ON products
+            USING GIST ((coalesce(description, '') || ' ' || coalesce(brand, '')) gist_trgm_ops);
+        """,
+        "DROP INDEX CONCURRENTLY IF EXISTS products_search_tsv_idx;",
+        "DROP INDEX CONCURRENTLY IF EXISTS products_search_trgm_idx;",
+    ], False),
+    ("import job row parse errors", [
+        "ALTER TABLE import_job_rows ADD COLUMN IF NOT EXISTS error TEXT;",
+    ], True),
+    ("import job leases", [
+        """
+        ALTER TABLE import_jobs
+            ADD COLUMN IF NOT EXISTS lease_token TEXT,
+            ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ;
+        """,
+        "CREATE INDEX IF NOT EXISTS import_jobs_pending_idx ON import_jobs (id) WHERE status IN ('queued', 'running');",
+    ], True),
+    ("import job row system ids", [
+        "ALTER TABLE import_job_rows ADD COLUMN IF NOT EXISTS system_id TEXT;",
+    ], True),
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+SCHEMA_LOCK_ID = 72120001
+_schema_checked = False
+
+def schema_version(cur):
+    cur.execute("SELECT to_regclass('schema_version') IS NOT NULL;")
+    if not cur.fetchone()[0]:
+        return 0
+    cur.execute("SELECT coalesce(max(version), 0) FROM schema_version;")
+    return cur.fetchone()[0]
+
+class SchemaNotMigrated(RuntimeError):
+    pass
+
+def check_schema(conn):
+    """Fail fast, once per process, when the database has not been migrated."""
+    global _schema_checked
+    if _schema_checked:
+        return
+    with conn.cursor() as cur:
+        version = schema_version(cur)
+    conn.rollback()
+    if version < SCHEMA_VERSION:
+        raise SchemaNotMigrated(
+            f"Database schema is at version {version}, expected {SCHEMA_VERSION}; "
+            "run `flask --app app migrate`."
+        )
+    _schema_checked = True
+
+def migrate_schema(conn):
+    """Apply pending migrations, then backfill the code index if it is empty."""
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute("SELECT pg_advisory_lock(%s);", (SCHEMA_LOCK_ID,))
+    try:
+        cur.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL);")
+        current = schema_version(cur)
+        for version, (description, statements, transactional) in enumerate(MIGRATIONS, start=1):
+            if version <= current:
+                continue
+            print(f"Applying migration {version}: {description}")
+            conn.autocommit = not transactional
+            for statement in statements:
+                cur.execute(statement)
+            cur.execute("INSERT INTO schema_version (version) VALUES (%s);", (version,))
+            if transactional:
+                conn.commit()
+            conn.autocommit = True
+
+        cur.execute("SELECT NOT EXISTS (SELECT 1 FROM product_codes) AND EXISTS (SELECT 1 FROM products);")
+        if cur.fetchone()[0]:
+            print("Backfilling product_codes")
+            conn.autocommit = False
+            rebuild_code_index(conn)
+            conn.commit()
+            conn.autocommit = True
+    finally:
+        if not conn.autocommit:
+            conn.rollback()
+            conn.autocommit = True
+        cur.execute("SELECT pg_advisory_unlock(%s);", (SCHEMA_LOCK_ID,))
+        cur.close()
+
+# Code Index
+# Every product identifier is stored under the canonical keys from codes.code_keys
+# in product_codes (code_key, system_id, source).
+CODE_SOURCES = ("upc_id", "custom_sku", "ean", "manufacture_sku")
+
+def code_index_rows(system_id, *codes):
+    for source, code in zip(CODE_SOURCES, codes):
+        for key in code_keys(code):
+            yield (key, str(system_id), source)
+
+def refresh_code_index(cur, products):
+    """Replace the index entries of the given (system_id, upc, custom_sku, ean, manufacture_sku) rows.
+
+    Returns the old and new code keys of those products, so cached lookups of
+    codes that moved between products can be invalidated.
+    """
+    latest = {str(product[0]): product for product in products}
+    if not latest:
+        return set()
+    cur.execute("DELETE FROM product_codes WHERE system_id = ANY(%s) RETURNING code_key;", (list(latest),))
+    touched = {row[0] for row in cur.fetchall()}
+    rows = [row for product in latest.values() for row in code_index_rows(*product)]
+    psycopg2.extras.execute_values(
+        cur,
+        "INSERT INTO product_codes (code_key, system_id, source) VALUES %s ON CONFLICT DO NOTHING;",
+        rows,
+        page_size=1000
+    )
+    touched.update(key for key, _, _ in rows)
+    return touched
+
+def rebuild_code_index(conn, batch_size=5000):
+    with conn.cursor(name="code_index_backfill") as source, conn.cursor() as cur:
+        source.itersize = batch_size
+        source.execute("SELECT system_id, upc_id, custom_sku, ean, manufacture_sku FROM products;")
+        batch = []
+        for product in source:
+            batch.append(product)
+            if len(batch) >= batch_size:
+                refresh_code_index(cur, batch)
+                batch = []
+        refresh_code_index(cur, batch)
+
+# Code Resolution
+MATCH_TIERS = {1: "exact", 2: "normalized", 3: "substring"}
+MAX_CANDIDATES = 5
+
+def system_id_code(code):
+    """system_id probe used by lookups: the first 12 characters, or the whole code when shorter."""
+    return code[:12] if len(code) >= 12 else code
+
+def import_system_id_code(code):
+    """system_id probe used by location imports, which only treat 12+ character codes as system ids."""
+    return code[:12] if len(code) >= 12 else None
+
+def match_code_index(cur, codes, system_id_probe=system_id_code):
+    """Probe system_id and the code index for each code; returns {code: (tier, system_ids)} for hits.
+
+    Index hits are joined back to products and re-checked against the current
+    code columns, so entries left behind by products deleted or edited outside
+    the app never count as matches and the caller falls back to substring search.
+    """
+    probe_codes, probe_keys, probe_tiers = [], [], []
+    for code in codes:
+        for key in code_keys(code):
+            probe_codes.append(code)
+            probe_keys.append(key)
+            probe_tiers.append(KEY_TIERS[key[0]])
+
+    sql = """
+        SELECT c.code, p.system_id, 1 AS tier, NULL, NULL
+        FROM unnest(%s::text[], %s::text[]) AS c(code, system_id_code)
+        JOIN products p ON p.system_id = c.system_id_code
+        UNION ALL
+        SELECT c.code, p.system_id, c.tier, c.code_key,
+               CASE pc.source
+                   WHEN 'upc_id' THEN p.upc_id
+                   WHEN 'custom_sku' THEN p.custom_sku
+                   WHEN 'ean' THEN p.ean
+                   WHEN 'manufacture_sku' THEN p.manufacture_sku
+               END
+        FROM unnest(%s::text[], %s::text[], %s::int[]) AS c(code, code_key, tier)
+        JOIN product_codes pc ON pc.code_key = c.code_key
+        JOIN products p ON p.system_id = pc.system_id;
+    """
+    args = (codes, [system_id_probe(code) for code in codes], probe_codes, probe_keys, probe_tiers)
+    cur.execute(sql, args)
+
+    matches = {}
+    for code, system_id, tier, code_key, current_code in cur.fetchall():
+        if code_key is not None and code_key not in code_keys(current_code):
+            continue
+        best_tier, system_ids = matches.get(code, (tier, []))
+        if tier < best_tier:
+            best_tier, system_ids = tier, []
+        if tier == best_tier and system_id not in system_ids:
+            system_ids.append(system_id)
+        matches[code] = (best_tier, system_ids)
+    return matches
+
+def resolve_codes(cur, codes, system_id_probe=system_id_code):
+    """Resolve scanned codes to system_ids in a few set-based queries.
+
+    Exact and normalized matches come from the code index; only codes left
+    unresolved fall back to substring matching. Returns
+    {code: (status, system_ids, match)} where status is "resolved",
+    "ambiguous" or "unmatched".
+    """
+    codes = list(dict.fromkeys(codes))
+    resolved = {}
+    if not codes:
+        return resolved
+
+    for code, (tier, system_ids) in match_code_index(cur, codes, system_id_probe).items():
+        status = "resolved" if len(system_ids) == 1 else "ambiguous"
+        resolved[code] = (status, system_ids, MATCH_TIERS[tier])
+
+    pending = [code for code in codes if code not in resolved and code.lstrip('0')]
+    if pending:
+        substring_sql = """
+            SELECT c.code, count(DISTINCT p.system_id), (array_agg(DISTINCT p.system_id))[1:%s]
+            FROM unnest(%s::text[], %s::text[]) AS c(code, pattern)
+            JOIN products p ON p.upc_id ILIKE c.pattern OR p.custom_sku ILIKE c.pattern OR p.manufacture_sku ILIKE c.pattern
+            GROUP BY c.code;
+        """
+        patterns = [f"%{code.lstrip('0')}%" for code in pending]
+        cur.execute(substring_sql, (MAX_CANDIDATES, pending, patterns))
+        for code, match_count, system_ids in cur.fetchall():
+            status = "resolved" if match_count == 1 else "ambiguous"
+            resolved[code] = (status, system_ids, MATCH_TIERS[3])
+
+    for code in codes:
+        resolved.setdefault(code, ("unmatched", [], None))
+    return resolved
+
+# Lookup Cache
+class LookupCache:
+    """Bounded LRU/TTL cache of serialized lookup responses.
+
+    Entries resolved through the code index remember the system_ids and code
+    keys they depend on and are only dropped when a product with one of those
+    ids changes or a code key is added to or removed from some product. Fuzzy
+    and search results can be affected by any write, so every invalidation
+    drops them. The cache is bounded by entry count and total body bytes;
+    bodies over max_entry_bytes are served but never cached. The generation
+    counter lets a request detect an invalidation that raced with its query
+    and skip caching the stale result.
+    """
+
+    def __init__(self, max_size, ttl, max_bytes, max_entry_bytes):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.generation = 0
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.skipped = 0
+
+    def _remove(self, key):
+        self.bytes -= len(self._entries.pop(key)["body"])
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["expires"] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body, system_ids, generation, code_keys=()):
+        entry = {
+            "body": body,
+            "etag": hashlib.sha1(body).hexdigest(),
+            "system_ids": frozenset(system_ids) if system_ids is not None else None,
+            "code_keys": frozenset(code_keys),
+            "expires": time.monotonic() + self.ttl,
+        }
+        with self._lock:
+            if generation != self.generation or self.max_size <= 0:
+                return entry
+            if len(body) > self.max_entry_bytes:
+                self.skipped += 1
+                return entry
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self.bytes += len(body)
+            while len(self._entries) > self.max_size or self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return entry
+
+    def invalidate(self, system_ids=None, code_keys=()):
+        """Drop entries touching system_ids or code_keys, or everything when system_ids is None."""
+        with self._lock:
+            self.generation += 1
+            if system_ids is None:
+                dropped = len(self._entries)
+                self._entries.clear()
+                self.bytes = 0
+            else:
+                system_ids = set(map(str, system_ids))
+                code_keys = set(code_keys)
+                stale = [
+                    key for key, entry in self._entries.items()
+                    if entry["system_ids"] is None
+                    or not entry["system_ids"].isdisjoint(system_ids)
+                    or not entry["code_keys"].isdisjoint(code_keys)
+                ]
+                for key in stale:
+                    self._remove(key)
+                dropped = len(stale)
+            self.invalidations += dropped
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "max_entry_bytes": self.max_entry_bytes,
+                "ttl": self.ttl,
+                "generation": self.generation,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "skipped": self.skipped,
+            }
+
+lookup_cache = LookupCache(LOOKUP_CACHE_SIZE, LOOKUP_CACHE_TTL, LOOKUP_CACHE_MAX_BYTES, LOOKUP_CACHE_MAX_ENTRY_BYTES)
+
+# Imports publish changed system_ids and the old and new code keys of changed
+# products on this channel; every worker's listener thread applies them to its
+# own cache. NOTIFY is transactional, so workers
+# only hear about committed changes.
+CACHE_CHANNEL = "lookup_cache_invalidate"
+CACHE_NOTIFY_MAX_BYTES = 7000
+_listener_pid = None
+_listener_lock = threading.Lock()
+
+def notify_lookup_cache(cur, system_ids, code_keys=()):
+    """Publish changed system_ids and code keys; None invalidates every cached lookup."""
+    payload = json.dumps({"system_ids": None})
+    if system_ids is not None:
+        changes = json.dumps({"system_ids": sorted(set(map(str, system_ids))), "code_keys": sorted(set(code_keys))})
+        if len(changes) <= CACHE_NOTIFY_MAX_BYTES:
+            payload = changes
+    cur.execute("SELECT pg_notify(%s, %s);", (CACHE_CHANNEL, payload))
+
+def listen_lookup_cache():
+    while True:
+        conn = None
+        try:
+            conn = psycopg2.connect(DATABASE_URL)
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {CACHE_CHANNEL};")
+            # Anything may have changed while we were not listening.
+            lookup_cache.invalidate()
+            while True:
+                if select.select([conn], [], [], 30) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    changes = json.loads(conn.notifies.pop(0).payload)
+                    lookup_cache.invalidate(changes.get("system_ids"), changes.get("code_keys", ()))
+        except Exception as e:
+            print(f"Lookup cache listener error: {e}")
+            lookup_cache.invalidate()
+            time.sleep(5)
+        finally:
+            if conn:
+                conn.close()
+
+def ensure_cache_listener():
+    global _listener_pid
+    if _listener_pid == os.getpid() or not DATABASE_URL or LOOKUP_CACHE_SIZE <= 0:
+        return
+    with _listener_lock:
+        if _listener_pid != os.getpid():
+            threading.Thread(target=listen_lookup_cache, name="lookup-cache-listener", daemon=True).start()
+            _listener_pid = os.getpid()
+
+# Location & Product Upserts
+# Shared by the synchronous endpoints and import jobs; callers own the transaction.
+def import_locations(cur, payloads):
+    """Resolve location payloads and upsert them into inventory.
+
+    Returns (results, summary, changed_ids) with one result per payload.
+    """
+    results = []
+    valid_rows = []
+    required_fields = ['upc', 'shelf_id', 'shelf_row', 'item_position']
+    for row, data in enumerate(payloads):
+        if not isinstance(data, dict) or not all(field in data for field in required_fields) or not data['upc']:
+            results.append({"row": row, "upc": None, "status": "invalid"})
+            continue
+        valid_rows.append((row, str(data['upc']).strip(), data))
+
+    resolved = resolve_codes(cur, [input_code for _, input_code, _ in valid_rows], import_system_id_code)
+
+    # Later rows win when the same product is placed twice on one shelf row,
+    # matching the previous one-statement-per-row behavior.
+    locations = {}
+    for row, input_code, data in valid_rows:
+        status, system_ids, match = resolved[input_code]
+        result = {"row": row, "upc": input_code, "status": status, "match": match}
+        if status == "resolved":
+            result["system_id"] = system_ids[0]
+            key = (system_ids[0], data['shelf_id'], data['shelf_row'])
+            locations[key] = data['item_position']
+        elif status == "ambiguous":
+            result["candidates"] = system_ids
+        results.append(result)
+    results.sort(key=lambda result: result["row"])
+
+    summary = {status: 0 for status in ("resolved", "ambiguous", "unmatched", "invalid")}
+    for result in results:
+        summary[result["status"]] += 1
+
+    changed_ids = {system_id for system_id, _, _ in locations}
+    if locations:
+        data_to_insert = [key + (item_position,) for key, item_position in locations.items()]
+        sql_upsert = """
+            INSERT INTO inventory (system_id, shelf_id, shelf_row, item_position)
+            VALUES %s
+            ON CONFLICT (system_id, shelf_id, shelf_row)
+            DO UPDATE SET item_position = EXCLUDED.item_position;
+        """
+        psycopg2.extras.execute_values(cur, sql_upsert, data_to_insert, page_size=1000)
+        notify_lookup_cache(cur, changed_ids)
+
+    return results, summary, changed_ids
+
+PRODUCT_COLUMNS = (
+    "system_id", "upc_id", "custom_sku", "ean", "manufacture_sku",
+    "description", "price", "category", "subcat_1", "subcat_2", "subcat_3", "brand"
+)
+UPDATABLE_PRODUCT_COLUMNS = PRODUCT_COLUMNS[1:]
+PRODUCT_MISSING_SAMPLE = 100
+
+# Rows whose content is unchanged are skipped by the WHERE guard, so a full
+# re-sync only writes new tuples (and WAL) for products that actually changed.
+# RETURNING (xmax = 0) tells freshly inserted rows from updated ones.
+PRODUCT_CONFLICT_SQL = """
+    ON CONFLICT (system_id) DO UPDATE
+    SET {assignments}
+    WHERE ({current}) IS DISTINCT FROM ({incoming})
+    RETURNING system_id, (xmax = 0) AS inserted
+""".format(
+    assignments=", ".join(f"{column} = EXCLUDED.{column}" for column in UPDATABLE_PRODUCT_COLUMNS),
+    current=", ".join(f"products.{column}" for column in UPDATABLE_PRODUCT_COLUMNS),
+    incoming=", ".join(f"EXCLUDED.{column}" for column in UPDATABLE_PRODUCT_COLUMNS),
+)
+
+def upsert_products(cur, data_to_insert):
+    """Upsert product tuples in PRODUCT_COLUMNS order, skipping rows that did not change.
+
+    Refreshes the code index and notifies the lookup cache for changed rows only.
+    Returns (counts, changed_ids, changed_keys) where counts holds
+    inserted/updated/unchanged and changed_keys the old and new code keys of
+    the changed rows.
+    """
+    # The last occurrence of a system_id wins; one INSERT cannot touch a row twice.
+    latest = {str(row[0]).strip(): (str(row[0]).strip(),) + tuple(row[1:]) for row in data_to_insert}
+    sql_upsert = f"""
+        INSERT INTO products ({", ".join(PRODUCT_COLUMNS)})
+        VALUES %s
+        {PRODUCT_CONFLICT_SQL};
+    """
+    returned = psycopg2.extras.execute_values(cur, sql_upsert, list(latest.values()), page_size=1000, fetch=True)
+
+    changed_ids = {system_id for system_id, _ in returned}
+    inserted = sum(1 for _, is_insert in returned if is_insert)
+    counts = {
+        "inserted": inserted,
+        "updated": len(returned) - inserted,
+        "unchanged": len(latest) - len(returned),
+    }
+    changed_keys = set()
+    if changed_ids:
+        changed_keys = refresh_code_index(cur, [latest[system_id][:5] for system_id in changed_ids])
+        notify_lookup_cache(cur, changed_ids, changed_keys)
+    return counts, changed_ids, changed_keys
+
+def products_missing_from_feed(cur, feed_condition, args):
+    """Count products not matched by feed_condition (a NOT EXISTS clause on p.system_id)."""
+    cur.execute(f"""
+        SELECT count(*), (array_agg(p.system_id ORDER BY p.system_id))[1:%s]
+        FROM products p
+        WHERE {feed_condition};
+    """, (PRODUCT_MISSING_SAMPLE,) + tuple(args))
+    count, sample = cur.fetchone()
+    return {"count": count, "system_ids": sample or []}
+
 # Blueprint: Import API
 import_bp = Blueprint("import_api", __name__)
 
@@ -52,57 +967,31 @@ def import_handler():
     if not payloads:
         return jsonify({"status": "error", "message": "No location data received."}), 400
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        data_to_insert = []
+        with db_connection() as conn:
+            cur = conn.cursor()
+            results, summary, changed_ids = import_locations(cur, payloads)
 
-        for data in payloads:
-            required_fields = ['upc', 'shelf_id', 'shelf_row', 'item_position']
-            if not all(field in data for field in required_fields) or not data['upc']:
-                continue
-
-            input_code = str(data['upc']).strip()
-            shelf_id = data['shelf_id']
-            shelf_row = data['shelf_row']
-            item_position = data['item_position']
-
-            truncated_code = input_code.lstrip('0')
-            search_pattern = f"%{truncated_code}%"
-            system_id_search_code = input_code[:12] if len(input_code) >= 12 else None
+            if not changed_ids:
+                return jsonify({
+                    "status": "error",
+                    "message": "No valid codes found.",
+                    "summary": summary,
+                    "results": results
+                }), 404
 
-            mapping_sql = """
-                SELECT system_id FROM products
-                WHERE system_id = %s OR upc_id ILIKE %s OR custom_sku ILIKE %s OR manufacture_sku ILIKE %s;
-            """
-            args = (system_id_search_code, search_pattern, search_pattern, search_pattern)
-            cur.execute(mapping_sql, args)
-            result = cur.fetchone()
-
-            if result:
-                actual_system_id = result[0]
-                data_to_insert.append((actual_system_id, shelf_id, shelf_row, item_position))
-
-        if not data_to_insert:
-            return jsonify({"status": "error", "message": "No valid codes found."}), 404
-
-        sql_upsert = """
-            INSERT INTO inventory (system_id, shelf_id, shelf_row, item_position)
-            VALUES (%s, %s, %s, %s)
-            ON CONFLICT (system_id, shelf_id, shelf_row)
-            DO UPDATE SET item_position = EXCLUDED.item_position;
-        """
-        psycopg2.extras.execute_batch(cur, sql_upsert, data_to_insert)
-        conn.commit()
+            conn.commit()
+            lookup_cache.invalidate(changed_ids)
 
-        return jsonify({"status": "success", "message": f"Mapped {len(data_to_insert)} locations."})
+            return jsonify({
+                "status": "success",
+                "message": f"Mapped {summary['resolved']} locations.",
+                "summary": summary,
+                "results": results
+            })
 
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
-    finally:
-        if conn:
-            conn.close()
 
 # Blueprint: Product Import API
 product_import_bp = Blueprint("product_import_api", __name__)
@@ -114,123 +1003,991 @@ def product_import_handler():
     if not isinstance(products_data, list) or not products_data:
         return jsonify({"status": "error", "message": "Payload must be a non-empty list of products."}), 400
 
+    # Same normalization as the streaming and job paths, so unchanged rows
+    # compare equal in the upsert's IS DISTINCT FROM guard.
+    progress = ImportProgress("Product import")
+    records = (
+        (line, item, None) if isinstance(item, dict) else (line, None, "Row is not a JSON object.")
+        for line, item in enumerate(products_data, start=1)
+    )
+    data_to_insert = [row[1:] for row in progress.staged_rows(records)]
+
+    if not data_to_insert:
+        return jsonify({
+            "status": "error",
+            "message": "No valid product rows with a system_id.",
+            "rejected": progress.rejected,
+            "rejects": progress.rejects
+        }), 400
+
+    snapshot = request.args.get("snapshot") == "1"
+    try:
+        with db_connection() as conn:
+            cur = conn.cursor()
+            counts, changed_ids, changed_keys = upsert_products(cur, data_to_insert)
+            response = {
+                "status": "success",
+                "message": f"Processed {len(data_to_insert)} product records.",
+                **counts,
+                "rejected": progress.rejected,
+                "rejects": progress.rejects
+            }
+            if snapshot:
+                feed_ids = [row[0] for row in data_to_insert]
+                response["missing"] = products_missing_from_feed(
+                    cur,
+                    "NOT EXISTS (SELECT 1 FROM unnest(%s::text[]) AS f(id) WHERE f.id = p.system_id)",
+                    (feed_ids,)
+                )
+            conn.commit()
+            lookup_cache.invalidate(changed_ids, changed_keys)
+
+            return jsonify(response)
+
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+# Streaming product import (POST /api/product-import/stream)
+# The body is raw CSV (text/csv) or NDJSON (application/x-ndjson). Rows are parsed
+# incrementally, COPYed into a temporary staging table and merged into products
+# with a single INSERT ... ON CONFLICT, so memory stays flat regardless of size.
+# Accepts both the API payload names and the product master CSV headers.
+# The response is a single summary once the import commits; clients that need
+# progress for long imports submit the same body to POST /api/jobs/product-import
+# and poll GET /api/jobs/<id>. Progress lines here only go to the server log.
+PRODUCT_FIELD_ALIASES = {
+    "system_id": "system_id", "System ID": "system_id",
+    "upc": "upc_id", "upc_id": "upc_id", "UPC": "upc_id",
+    "custom_sku": "custom_sku", "Custom SKU": "custom_sku",
+    "ean": "ean", "EAN": "ean",
+    "manufacture_sku": "manufacture_sku", "Manufact. SKU": "manufacture_sku",
+    "description": "description", "Item": "description",
+    "price": "price", "Price": "price",
+    "category": "category", "Category": "category",
+    "subcat_1": "subcat_1", "Subcategory 1": "subcat_1",
+    "subcat_2": "subcat_2", "Subcategory 2": "subcat_2",
+    "subcat_3": "subcat_3", "Subcategory 3": "subcat_3",
+    "brand": "brand", "Brand": "brand",
+}
+STREAM_CHUNK_SIZE = 64 * 1024
+STREAM_PROGRESS_EVERY = 50000
+STREAM_MAX_REJECTS = 100
+STREAM_NOTIFY_MAX_IDS = 500
+
+def iter_text_lines(stream):
+    """Yield newline-terminated lines from a byte stream without buffering the whole body."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    while True:
+        chunk = stream.read(STREAM_CHUNK_SIZE)
+        pending += decoder.decode(chunk, final=not chunk)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line + "\n"
+        if not chunk:
+            break
+    if pending:
+        yield pending
+
+def iter_import_records(stream, content_type):
+    """Yield (line_number, record, error) triples.
+
+    record is a dict, or None with an error message for a line that could not
+    be parsed; malformed rows are reported without aborting the rest of the body.
+    """
+    lines = iter_text_lines(stream)
+    if content_type == "text/csv":
+        reader = csv.DictReader(lines)
+        try:
+            reader.fieldnames
+        except csv.Error as e:
+            yield reader.reader.line_num, None, f"Malformed CSV header: {e}"
+            return
+        while True:
+            try:
+                record = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                yield reader.reader.line_num, None, f"Malformed CSV row: {e}"
+                continue
+            yield reader.line_num, record, None
+    else:
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_number, None, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(record, dict):
+                yield line_number, None, "Row is not a JSON object."
+                continue
+            yield line_number, record, None
+
+def parse_price(value):
+    value = empty_to_none(value)
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = re.sub(r"[^0-9.\-]", "", value)
+    return float(value)
+
+def parse_product_record(record):
+    """Map a raw import record onto PRODUCT_COLUMNS; raises ValueError for unusable rows."""
+    if record is None:
+        raise ValueError("Row could not be parsed.")
+    values = {}
+    for field, value in record.items():
+        column = PRODUCT_FIELD_ALIASES.get(field.strip()) if isinstance(field, str) else None
+        if column:
+            values[column] = value
+    if not empty_to_none(values.get("system_id")):
+        raise ValueError("Missing system_id.")
+    try:
+        values["price"] = parse_price(values.get("price"))
+    except ValueError:
+        raise ValueError(f"Invalid price: {values.get('price')!r}")
+    return tuple(
+        values["price"] if column == "price" else empty_to_none(values.get(column))
+        for column in PRODUCT_COLUMNS
+    )
+
+class ImportProgress:
+    def __init__(self, label):
+        self.label = label
+        self.received = 0
+        self.staged = 0
+        self.rejected = 0
+        self.rejects = []
+
+    def reject(self, line, message):
+        self.rejected += 1
+        if len(self.rejects) < STREAM_MAX_REJECTS:
+            self.rejects.append({"line": line, "message": message})
+
+    def staged_rows(self, records):
+        for line, record, error in records:
+            self.received += 1
+            if error:
+                self.reject(line, error)
+                continue
+            try:
+                row = parse_product_record(record)
+            except ValueError as e:
+                self.reject(line, str(e))
+                continue
+            self.staged += 1
+            if self.staged % STREAM_PROGRESS_EVERY == 0:
+                print(f"{self.label}: {self.staged} rows staged, {self.rejected} rejected")
+            yield (line,) + row
+
+class CopyRowStream:
+    """File-like adapter that lets COPY pull CSV-encoded rows from a generator."""
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._out = io.StringIO()
+        self._writer = csv.writer(self._out, lineterminator="\n")
+        self._buffer = ""
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._writer.writerow(row)
+            self._buffer += self._out.getvalue()
+            self._out.seek(0)
+            self._out.truncate()
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+@product_import_bp.route("/stream", methods=["POST"])
+@require_api_key
+def product_stream_import_handler():
+    content_type = request.mimetype
+    if content_type in ("application/jsonl", "application/ndjson"):
+        content_type = "application/x-ndjson"
+    if content_type not in ("text/csv", "application/x-ndjson"):
+        return jsonify({"status": "error", "message": "Body must be text/csv or application/x-ndjson."}), 415
+
+    progress = ImportProgress("Product stream import")
+    columns = ", ".join(PRODUCT_COLUMNS)
+    try:
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                CREATE TEMP TABLE product_import_staging (
+                    line INTEGER,
+                    system_id TEXT, upc_id TEXT, custom_sku TEXT, ean TEXT, manufacture_sku TEXT,
+                    description TEXT, price NUMERIC, category TEXT,
+                    subcat_1 TEXT, subcat_2 TEXT, subcat_3 TEXT, brand TEXT
+                ) ON COMMIT DROP;
+            """)
+            rows = progress.staged_rows(iter_import_records(request.stream, content_type))
+            cur.copy_expert(
+                f"COPY product_import_staging (line, {columns}) FROM STDIN WITH (FORMAT csv)",
+                CopyRowStream(rows)
+            )
+
+            if not progress.staged:
+                return jsonify({
+                    "status": "error",
+                    "message": "No valid product rows with a system_id.",
+                    "received": progress.received,
+                    "rejected": progress.rejected,
+                    "rejects": progress.rejects
+                }), 400
+
+            # The last occurrence of a system_id in the feed wins.
+            cur.execute("CREATE TEMP TABLE product_import_changed (system_id TEXT PRIMARY KEY) ON COMMIT DROP;")
+            cur.execute(f"""
+                WITH merged AS (
+                    INSERT INTO products ({columns})
+                    SELECT DISTINCT ON (system_id) {columns}
+                    FROM product_import_staging
+                    ORDER BY system_id, line DESC
+                    {PRODUCT_CONFLICT_SQL}
+                ),
+                changed AS (
+                    INSERT INTO product_import_changed SELECT system_id FROM merged
+                )
+                SELECT
+                    (SELECT count(DISTINCT system_id) FROM product_import_staging),
+                    count(*) FILTER (WHERE inserted),
+                    count(*) FILTER (WHERE NOT inserted)
+                FROM merged;
+            """)
+            merged, inserted, updated = cur.fetchone()
+            counts = {"inserted": inserted, "updated": updated, "unchanged": merged - inserted - updated}
+
+            with conn.cursor(name="product_import_codes") as staged:
+                staged.itersize = 5000
+                staged.execute("""
+                    SELECT DISTINCT ON (s.system_id) s.system_id, s.upc_id, s.custom_sku, s.ean, s.manufacture_sku
+                    FROM product_import_staging s
+                    JOIN product_import_changed c ON c.system_id = s.system_id
+                    ORDER BY s.system_id, s.line DESC;
+                """)
+                # Keys are only worth collecting when the change set is small
+                # enough to be published; larger imports invalidate everything.
+                track_keys = inserted + updated <= STREAM_NOTIFY_MAX_IDS
+                changed_keys = set()
+                batch = []
+                for product in staged:
+                    batch.append(product)
+                    if len(batch) >= staged.itersize:
+                        touched = refresh_code_index(cur, batch)
+                        if track_keys:
+                            changed_keys |= touched
+                        batch = []
+                touched = refresh_code_index(cur, batch)
+                if track_keys:
+                    changed_keys |= touched
+
+            changed_ids = None
+            if track_keys:
+                cur.execute("SELECT system_id FROM product_import_changed;")
+                changed_ids = {row[0] for row in cur.fetchall()}
+            if changed_ids is None or changed_ids:
+                notify_lookup_cache(cur, changed_ids, changed_keys)
+
+            response = {
+                "status": "success",
+                "message": f"Processed {merged} product records.",
+                "received": progress.received,
+                "staged": progress.staged,
+                "merged": merged,
+                **counts,
+                "rejected": progress.rejected,
+                "rejects": progress.rejects
+            }
+            if request.args.get("snapshot") == "1":
+                response["missing"] = products_missing_from_feed(
+                    cur,
+                    "NOT EXISTS (SELECT 1 FROM product_import_staging s WHERE s.system_id = p.system_id)",
+                    ()
+                )
+            conn.commit()
+            if changed_ids is None or changed_ids:
+                lookup_cache.invalidate(changed_ids, changed_keys)
+            print(f"{progress.label}: {counts}, {progress.rejected} rejected")
+
+            return jsonify(response)
+
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+# Import Jobs
+# Uploaded rows are persisted in import_job_rows; import_jobs is the queue. Runner
+# threads normally live in a separate `flask --app app run-jobs` process, so long
+# imports never compete with lookups for the web workers' GIL and connection pool;
+# JOB_WORKERS > 0 additionally runs that many in each web worker. Runners
+# claim the oldest queued job with FOR UPDATE SKIP LOCKED, or a running job whose
+# lease expired because its runner died, and process it in chunks of
+# JOB_CHUNK_SIZE. Each chunk commits together with the job's next_row and a lease
+# renewal that only succeeds while the runner still holds the job's lease token,
+# so a job survives restarts and never has two live runners.
+JOB_KINDS = ("import", "product-import")
+JOB_MAX_ERRORS_RETURNED = 100
+_job_runner_pid = None
+_job_runner_lock = threading.Lock()
+_job_wakeup = threading.Event()
+
+class JobLeaseLost(Exception):
+    pass
+
+def claim_job(cur, token):
+    """Lease the next runnable job to token; returns (id, kind, next_row, snapshot) or None."""
+    cur.execute("""
+        UPDATE import_jobs
+        SET status = 'running', message = NULL,
+            lease_token = %s, lease_expires_at = now() + make_interval(secs => %s),
+            started_at = coalesce(started_at, now()), updated_at = now()
+        WHERE id = (
+            SELECT id FROM import_jobs
+            WHERE status = 'queued' OR (status = 'running' AND lease_expires_at < now())
+            ORDER BY id
+            FOR UPDATE SKIP LOCKED
+            LIMIT 1
+        )
+        RETURNING id, kind, next_row, snapshot;
+    """, (token, JOB_LEASE_SECONDS))
+    return cur.fetchone()
+
+def update_leased_job(cur, job_id, token, assignments, args=(), renew=True):
+    """Apply assignments to a job this runner holds; raises JobLeaseLost otherwise.
+
+    With renew the lease is extended by JOB_LEASE_SECONDS; finalizing updates
+    pass renew=False and release the lease in their own assignments.
+    """
+    if renew:
+        assignments += ", lease_expires_at = now() + make_interval(secs => %s)"
+        args = tuple(args) + (JOB_LEASE_SECONDS,)
+    cur.execute(f"""
+        UPDATE import_jobs
+        SET {assignments}, updated_at = now()
+        WHERE id = %s AND lease_token = %s;
+    """, tuple(args) + (job_id, token))
+    if cur.rowcount != 1:
+        raise JobLeaseLost(f"Import job {job_id} lease lost.")
+
+def run_next_job(conn):
+    """Claim and run one job; returns False when nothing was runnable."""
+    token = uuid.uuid4().hex
+    claimed = claim_job(conn.cursor(), token)
+    conn.commit()
+    if not claimed:
+        return False
+    run_job(conn, token, *claimed)
+    return True
+
+def job_runner():
+    # Runners keep a dedicated connection rather than holding a pooled one for a
+    # whole job, so they never take pool capacity away from request handlers.
+    conn = None
+    while True:
+        try:
+            if conn is None or conn.closed:
+                conn = get_db_connection()
+            ran = run_next_job(conn)
+        except Exception as e:
+            print(f"Import job runner error: {e}")
+            if conn is not None:
+                conn.close()
+            conn = None
+            ran = False
+        if not ran:
+            _job_wakeup.wait(JOB_POLL_SECONDS)
+            _job_wakeup.clear()
+
+def ensure_job_runners(workers=None):
+    global _job_runner_pid
+    workers = JOB_WORKERS if workers is None else workers
+    if _job_runner_pid == os.getpid() or not DATABASE_URL or workers <= 0:
+        return
+    with _job_runner_lock:
+        if _job_runner_pid != os.getpid():
+            for i in range(workers):
+                threading.Thread(target=job_runner, name=f"import-job-{i}", daemon=True).start()
+            _job_runner_pid = os.getpid()
+
+def submit_job():
+    ensure_job_runners()
+    _job_wakeup.set()
+
+def process_job_chunk(cur, kind, rows):
+    """Apply one chunk of (row_idx, line, data, error) rows; returns (counts, changed_ids, changed_keys, errors)."""
+    errors = []
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    if kind == "import":
+        results, _, changed_ids = import_locations(cur, [data for _, _, data, _ in rows])
+        for (row_idx, line, _, error), result in zip(rows, results):
+            if error:
+                errors.append((row_idx, line, error))
+            elif result["status"] == "invalid":
+                errors.append((row_idx, line, "Missing upc, shelf_id, shelf_row or item_position."))
+            elif result["status"] != "resolved":
+                errors.append((row_idx, line, f"Code {result['upc']!r} is {result['status']}."))
+        return counts, changed_ids, set(), errors
+
     data_to_insert = []
-    for item in products_data:
-        system_id_value = item.get('system_id')
-        if not system_id_value or len(str(system_id_value).strip()) == 0:
+    for row_idx, line, data, error in rows:
+        if error:
+            errors.append((row_idx, line, error))
             continue
+        try:
+            data_to_insert.append(parse_product_record(data))
+        except ValueError as e:
+            errors.append((row_idx, line, str(e)))
+    changed_ids, changed_keys = set(), set()
+    if data_to_insert:
+        counts, changed_ids, changed_keys = upsert_products(cur, data_to_insert)
+    return counts, changed_ids, changed_keys, errors
 
-        data_to_insert.append((
-            system_id_value,
-            empty_to_none(item.get('upc')),
-            empty_to_none(item.get('custom_sku')),
-            empty_to_none(item.get('ean')),
-            empty_to_none(item.get('manufacture_sku')),
-            item.get('description'),
-            item.get('price'),
-            item.get('category'),
-            item.get('subcat_1'),
-            item.get('subcat_2'),
-            item.get('subcat_3'),
-            item.get('brand')
-        ))
+def run_job(conn, token, job_id, kind, next_row, snapshot):
+    cur = conn.cursor()
+    try:
+        while True:
+            cur.execute("""
+                SELECT row_idx, line, data, error FROM import_job_rows
+                WHERE job_id = %s AND row_idx >= %s
+                ORDER BY row_idx
+                LIMIT %s;
+            """, (job_id, next_row, JOB_CHUNK_SIZE))
+            rows = cur.fetchall()
+            if not rows:
+                break
 
-    if not data_to_insert:
-        return jsonify({"status": "error", "message": "No valid product rows with a system_id."}), 400
+            counts, changed_ids, changed_keys, errors = process_job_chunk(cur, kind, rows)
+            if errors:
+                psycopg2.extras.execute_values(
+                    cur,
+                    "INSERT INTO import_job_errors (job_id, row_idx, line, message) VALUES %s;",
+                    [(job_id,) + error for error in errors]
+                )
+            next_row = rows[-1][0] + 1
+            update_leased_job(cur, job_id, token, """
+                next_row = %s, processed_rows = processed_rows + %s,
+                error_count = error_count + %s,
+                inserted_rows = inserted_rows + %s,
+                updated_rows = updated_rows + %s,
+                unchanged_rows = unchanged_rows + %s
+            """, (
+                next_row, len(rows), len(errors),
+                counts["inserted"], counts["updated"], counts["unchanged"]
+            ))
+            conn.commit()
+            if changed_ids:
+                lookup_cache.invalidate(changed_ids, changed_keys)
 
-    conn = None
+        missing = None
+        if snapshot and kind == "product-import":
+            missing = products_missing_from_feed(cur, """
+                NOT EXISTS (
+                    SELECT 1 FROM import_job_rows r
+                    WHERE r.job_id = %s AND r.system_id = p.system_id
+                )
+            """, (job_id,))
+        update_leased_job(cur, job_id, token, """
+            status = 'succeeded', missing = %s, finished_at = now(),
+            lease_token = NULL, lease_expires_at = NULL
+        """, (psycopg2.extras.Json(missing) if missing else None,), renew=False)
+        cur.execute("DELETE FROM import_job_rows WHERE job_id = %s;", (job_id,))
+        conn.commit()
+
+    except JobLeaseLost as e:
+        # Another runner took the job over; its work supersedes ours.
+        conn.rollback()
+        print(e)
+
+    except Exception as e:
+        conn.rollback()
+        print(f"Import job {job_id} failed: {e}")
+        try:
+            update_leased_job(cur, job_id, token, """
+                status = 'failed', message = %s, lease_token = NULL, lease_expires_at = NULL
+            """, (str(e),), renew=False)
+            conn.commit()
+        except Exception as e:
+            # Lease lost or connection broken: the lease expires and another runner retries.
+            conn.rollback()
+            print(f"Import job {job_id} could not be marked failed: {e}")
+
+def job_records():
+    """Yield (line, record, error) triples from a JSON list, CSV or NDJSON request body."""
+    if request.mimetype == "application/json":
+        payload = request.get_json()
+        payload = [payload] if isinstance(payload, dict) else payload
+        if not isinstance(payload, list):
+            raise ValueError("Invalid payload format.")
+        return (
+            (line, item, None) if isinstance(item, dict) else (line, None, "Row is not a JSON object.")
+            for line, item in enumerate(payload, start=1)
+        )
+    if request.mimetype in ("application/x-ndjson", "application/jsonl", "application/ndjson"):
+        return iter_import_records(request.stream, "application/x-ndjson")
+    if request.mimetype == "text/csv":
+        return iter_import_records(request.stream, "text/csv")
+    raise ValueError("Body must be application/json, text/csv or application/x-ndjson.")
+
+def job_row_system_id(kind, record):
+    """Parsed system_id of a product job row, or None when the row will be rejected."""
+    if kind != "product-import":
+        return None
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
+        return parse_product_record(record)[0]
+    except ValueError:
+        return None
 
-        sql_upsert = """
-            INSERT INTO products (
-                system_id, upc_id, custom_sku, ean, manufacture_sku,
-                description, price, category, subcat_1, subcat_2, subcat_3, brand
+def serialize_job(job):
+    job = dict(job)
+    elapsed = job.pop("elapsed_seconds")
+    job["throughput_rows_per_sec"] = round(job["processed_rows"] / elapsed, 1) if elapsed else None
+    job["progress"] = round(job["processed_rows"] / job["total_rows"], 4) if job["total_rows"] else None
+    for field in ("created_at", "started_at", "finished_at", "updated_at"):
+        job[field] = job[field].isoformat() if job[field] else None
+    return job
+
+# Blueprint: Jobs API
+jobs_bp = Blueprint("jobs_api", __name__)
+
+@jobs_bp.route("/<kind>", methods=["POST"])
+@require_api_key
+def job_submit_handler(kind):
+    if kind not in JOB_KINDS:
+        return jsonify({"status": "error", "message": f"Unknown job kind: {kind}"}), 404
+
+    try:
+        records = job_records()
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    try:
+        with db_connection() as conn:
+            cur = conn.cursor()
+            snapshot = kind == "product-import" and request.args.get("snapshot") == "1"
+            cur.execute("INSERT INTO import_jobs (kind, snapshot) VALUES (%s, %s) RETURNING id;", (kind, snapshot))
+            job_id = cur.fetchone()[0]
+
+            total_rows = 0
+            def job_rows():
+                nonlocal total_rows
+                for row_idx, (line, record, error) in enumerate(records):
+                    total_rows += 1
+                    yield (
+                        job_id, row_idx, line,
+                        json.dumps(record) if record is not None else None,
+                        error,
+                        job_row_system_id(kind, record) if not error else None
+                    )
+
+            cur.copy_expert(
+                "COPY import_job_rows (job_id, row_idx, line, data, error, system_id) FROM STDIN WITH (FORMAT csv)",
+                CopyRowStream(job_rows())
             )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (system_id) DO UPDATE
-            SET 
-                upc_id = EXCLUDED.upc_id,
-                custom_sku = EXCLUDED.custom_sku,
-                ean = EXCLUDED.ean,
-                manufacture_sku = EXCLUDED.manufacture_sku,
-                description = EXCLUDED.description,
-                price = EXCLUDED.price,
-                category = EXCLUDED.category,
-                subcat_1 = EXCLUDED.subcat_1,
-                subcat_2 = EXCLUDED.subcat_2,
-                subcat_3 = EXCLUDED.subcat_3,
-                brand = EXCLUDED.brand;
-        """
-        psycopg2.extras.execute_batch(cur, sql_upsert, data_to_insert)
-        conn.commit()
+            if not total_rows:
+                return jsonify({"status": "error", "message": "No rows received."}), 400
+
+            cur.execute("UPDATE import_jobs SET total_rows = %s WHERE id = %s;", (total_rows, job_id))
+            conn.commit()
 
-        return jsonify({"status": "success", "message": f"Processed {len(data_to_insert)} product records."})
+        submit_job()
+        return jsonify({"status": "queued", "job_id": job_id, "total_rows": total_rows}), 202
 
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
-    finally:
-        if conn:
-            conn.close()
+
+@jobs_bp.route("/<int:job_id>", methods=["GET"])
+@require_api_key
+def job_status_handler(job_id):
+    try:
+        with db_connection() as conn:
+            cur = conn.cursor(cursor_factory=DICT_CURSOR)
+            cur.execute("""
+                SELECT id, kind, status, snapshot, total_rows, next_row, processed_rows, error_count,
+                       inserted_rows, updated_rows, unchanged_rows, missing, message,
+                       created_at, started_at, finished_at, updated_at,
+                       extract(epoch FROM coalesce(finished_at, now()) - started_at)::float AS elapsed_seconds
+                FROM import_jobs WHERE id = %s;
+            """, (job_id,))
+            job = cur.fetchone()
+            if not job:
+                return jsonify({"status": "error", "message": "Job not found."}), 404
+
+            cur.execute("""
+                SELECT row_idx, line, message FROM import_job_errors
+                WHERE job_id = %s ORDER BY row_idx LIMIT %s;
+            """, (job_id, JOB_MAX_ERRORS_RETURNED))
+            job = serialize_job(job)
+            job["errors"] = cur.fetchall()
+            return jsonify(job)
+
+    except psycopg2.Error as e:
+        return handle_db_error(e)
+
+@jobs_bp.route("/<int:job_id>/resume", methods=["POST"])
+@require_api_key
+def job_resume_handler(job_id):
+    try:
+        with db_connection() as conn:
+            cur = conn.cursor()
+            # Only failed jobs need resuming; runners pick up queued jobs and jobs
+            # whose runner died (expired lease) on their own.
+            cur.execute("""
+                UPDATE import_jobs SET status = 'queued', message = NULL, updated_at = now()
+                WHERE id = %s AND status = 'failed'
+                RETURNING next_row, total_rows;
+            """, (job_id,))
+            resumed = cur.fetchone()
+            conn.commit()
+
+        if not resumed:
+            return jsonify({"status": "error", "message": "Job is not resumable."}), 409
+
+        submit_job()
+        return jsonify({"status": "queued", "job_id": job_id, "next_row": resumed[0], "total_rows": resumed[1]}), 202
+
+    except psycopg2.Error as e:
+        return handle_db_error(e)
 
 # Blueprint: Lookup API
 lookup_bp = Blueprint("lookup_api", __name__)
 
-@lookup_bp.route("", methods=["GET"])
-def lookup_handler():
-    query = request.args.get("q", "").strip()
+# Ranked search mode (?mode=search). Must match the expression of the search index.
+SEARCH_DOCUMENT = "coalesce(p.description, '') || ' ' || coalesce(p.brand, '')"
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+SEARCH_MAX_CANDIDATES = int(os.environ.get("SEARCH_MAX_CANDIDATES", "500"))
+SEARCH_FIELDS = {
+    "system_id": "r.system_id",
+    "upc_id": "r.upc_id",
+    "custom_sku": "r.custom_sku",
+    "ean": "r.ean",
+    "manufacture_sku": "r.manufacture_sku",
+    "description": "r.description",
+    "price": "r.price",
+    "category": "r.category",
+    "subcat_1": "r.subcat_1",
+    "subcat_2": "r.subcat_2",
+    "subcat_3": "r.subcat_3",
+    "brand": "r.brand",
+    "shelf_id": "i.shelf_id",
+    "shelf_row": "i.shelf_row",
+    "item_position": "i.item_position",
+    "score": "r.score",
+}
+SEARCH_KEYSET_FIELDS = ("score", "system_id", "shelf_id", "shelf_row")
+
+def encode_search_cursor(row):
+    values = [str(row["score"]), row["system_id"], row["shelf_id"], row["shelf_row"]]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+def decode_search_cursor(cursor):
+    score, system_id, shelf_id, shelf_row = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return (str(score), system_id, shelf_id, shelf_row)
+
+def search_handler(query):
+    """Rank products by exact code hit, then full-text and trigram relevance.
+
+    Candidates are the exact code hits plus the SEARCH_MAX_CANDIDATES nearest
+    trigram matches by word distance (ties broken by system_id, so every page
+    sees the same set), read in order from the GiST index. Full-text rank only
+    scores that bounded set, so no page touches every product. Rows are paginated
+    with a keyset cursor on (score, system_id, shelf_id, shelf_row).
+    """
+    try:
+        limit = min(max(int(request.args.get("limit", SEARCH_DEFAULT_LIMIT)), 1), SEARCH_MAX_LIMIT)
+    except ValueError:
+        return jsonify({"status": "error", "message": "limit must be an integer."}), 400
+
+    fields = [f.strip() for f in request.args.get("fields", "").split(",") if f.strip()] or list(SEARCH_FIELDS)
+    unknown = [f for f in fields if f not in SEARCH_FIELDS]
+    if unknown:
+        return jsonify({"status": "error", "message": f"Unknown fields: {', '.join(unknown)}"}), 400
+
+    cursor = request.args.get("cursor")
+    after = None
+    if cursor:
+        try:
+            after = decode_search_cursor(cursor)
+        except (ValueError, TypeError):
+            return jsonify({"status": "error", "message": "Invalid cursor."}), 400
+
     if not query:
-        return jsonify([])
+        return jsonify({"results": [], "next_cursor": None})
+
+    tokens = re.findall(r"\w+", query.lower())
+    ts_query = " & ".join(f"{token}:*" for token in tokens) or None
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        with db_connection() as conn:
+            cur = conn.cursor(cursor_factory=DICT_CURSOR)
 
-        input_code = query
-        system_id_search_code = input_code[:12] if len(input_code) >= 12 else input_code
-        truncated_code = input_code.lstrip('0')
-        search_pattern = f"%{truncated_code}%"
+            index_hits = match_code_index(conn.cursor(), [query])
+            exact_ids = index_hits[query][1] if query in index_hits else []
 
-        sql = """
-            SELECT 
+            selected = list(dict.fromkeys(fields + list(SEARCH_KEYSET_FIELDS)))
+            select_list = ", ".join(f"{SEARCH_FIELDS[f]} AS {f}" for f in selected)
+            keyset_sql = ""
+            if after:
+                keyset_sql = """
+                    WHERE r.score < %(after_score)s::numeric
+                       OR (r.score = %(after_score)s::numeric
+                           AND (r.system_id, i.shelf_id, i.shelf_row) > (%(after_system_id)s, %(after_shelf_id)s, %(after_shelf_row)s))
+                """
+
+            sql = f"""
+                WITH candidates AS (
+                    SELECT p.system_id FROM products p WHERE p.system_id = ANY(%(exact_ids)s)
+                    UNION
+                    (
+                        SELECT p.system_id
+                        FROM products p
+                        WHERE %(query)s <%% ({SEARCH_DOCUMENT})
+                        ORDER BY %(query)s <<-> ({SEARCH_DOCUMENT}), p.system_id
+                        LIMIT %(max_candidates)s
+                    )
+                ),
+                ranked AS (
+                    SELECT
+                        p.system_id, p.upc_id, p.custom_sku, p.ean, p.manufacture_sku,
+                        p.description, p.price, p.category, p.subcat_1, p.subcat_2, p.subcat_3, p.brand,
+                        round((
+                            CASE WHEN p.system_id = ANY(%(exact_ids)s) THEN 10 ELSE 0 END
+                            + coalesce(ts_rank(to_tsvector('simple', {SEARCH_DOCUMENT}), to_tsquery('simple', %(ts_query)s)), 0)
+                            + word_similarity(%(query)s, {SEARCH_DOCUMENT})
+                        )::numeric, 6) AS score
+                    FROM candidates c
+                    JOIN products p ON p.system_id = c.system_id
+                )
+                SELECT {select_list}
+                FROM ranked r
+                JOIN inventory i ON i.system_id = r.system_id
+                {keyset_sql}
+                ORDER BY r.score DESC, r.system_id, i.shelf_id, i.shelf_row
+                LIMIT %(limit)s;
+            """
+            args = {
+                "exact_ids": exact_ids,
+                "ts_query": ts_query,
+                "query": query,
+                "max_candidates": SEARCH_MAX_CANDIDATES,
+                "limit": limit + 1
+            }
+            if after:
+                args.update(zip(("after_score", "after_system_id", "after_shelf_id", "after_shelf_row"), after))
+
+            cur.execute(sql, args)
+            rows = cur.fetchall()
+
+            next_cursor = encode_search_cursor(rows[limit - 1]) if len(rows) > limit else None
+            results = [{f: row[f] for f in fields} for row in rows[:limit]]
+            return jsonify({"results": results, "next_cursor": next_cursor})
+
+    except psycopg2.Error as e:
+        return handle_db_error(e)
+
+def code_lookup_handler(query):
+    try:
+        with db_connection() as conn:
+            cur = conn.cursor(cursor_factory=DICT_CURSOR)
+
+            columns = """
                 p.system_id, p.upc_id, p.custom_sku, p.ean, p.manufacture_sku,
                 p.description, p.price, p.category, p.subcat_1, p.subcat_2, p.subcat_3,
                 p.brand, i.shelf_id, i.shelf_row, i.item_position
-            FROM products p
-            JOIN inventory i ON p.system_id = i.system_id
-            WHERE p.system_id = %s OR
-                  p.upc_id ILIKE %s OR
-                  p.custom_sku ILIKE %s OR
-                  p.ean ILIKE %s OR
-                  p.manufacture_sku ILIKE %s OR
-                  p.description ILIKE %s OR
-                  p.brand ILIKE %s
-            ORDER BY p.description, i.item_position;
-        """
-        args = (
-            system_id_search_code,
-            search_pattern,
-            search_pattern,
-            search_pattern,
-            search_pattern,
-            search_pattern,
-            search_pattern
+            """
+
+            # Indexed equality probe first; scanned codes almost always resolve here.
+            index_hits = match_code_index(conn.cursor(), [query])
+            if query in index_hits:
+                _, system_ids = index_hits[query]
+                sql = f"""
+                    SELECT {columns}
+                    FROM products p
+                    JOIN inventory i ON p.system_id = i.system_id
+                    WHERE p.system_id = ANY(%s)
+                    ORDER BY p.description, i.item_position;
+                """
+                cur.execute(sql, (system_ids,))
+                items = cur.fetchall()
+                if items:
+                    # A product later created with the probed system_id, or gaining or
+                    # losing one of these keys, changes this result.
+                    g.lookup_system_ids = system_ids + [system_id_code(query)]
+                    g.lookup_code_keys = code_keys(query)
+                    return jsonify(items)
+
+            input_code = query
+            system_id_search_code = system_id_code(input_code)
+            truncated_code = input_code.lstrip('0')
+            search_pattern = f"%{truncated_code}%"
+
+            sql = f"""
+                SELECT {columns}
+                FROM products p
+                JOIN inventory i ON p.system_id = i.system_id
+                WHERE p.system_id = %s OR
+                      p.upc_id ILIKE %s OR
+                      p.custom_sku ILIKE %s OR
+                      p.ean ILIKE %s OR
+                      p.manufacture_sku ILIKE %s OR
+                      p.description ILIKE %s OR
+                      p.brand ILIKE %s
+                ORDER BY p.description, i.item_position;
+            """
+            args = (
+                system_id_search_code,
+                search_pattern,
+                search_pattern,
+                search_pattern,
+                search_pattern,
+                search_pattern,
+                search_pattern
+            )
+
+            cur.execute(sql, args)
+            items = cur.fetchall()
+            return jsonify(items)
+
+    except psycopg2.Error as e:
+        return handle_db_error(e)
+
+@lookup_bp.route("", methods=["GET"])
+def lookup_handler():
+    query = " ".join(request.args.get("q", "").split())
+    mode = request.args.get("mode")
+    if mode != "search" and not query:
+        return jsonify([])
+
+    ensure_cache_listener()
+    cache_key = json.dumps([
+        mode,
+        query,
+        request.args.get("limit"),
+        request.args.get("cursor"),
+        request.args.get("fields"),
+    ])
+    entry = lookup_cache.get(cache_key)
+    if entry is None:
+        generation = lookup_cache.generation
+        response = make_response(search_handler(query) if mode == "search" else code_lookup_handler(query))
+        if response.status_code != 200:
+            return response
+        entry = lookup_cache.put(
+            cache_key, response.get_data(), g.get("lookup_system_ids"), generation, g.get("lookup_code_keys", ())
         )
 
-        cur.execute(sql, args)
-        items = cur.fetchall()
-        return jsonify(items)
+    response = make_response(entry["body"])
+    response.mimetype = "application/json"
+    response.set_etag(entry["etag"])
+    response.headers["Cache-Control"] = f"private, max-age={LOOKUP_CACHE_MAX_AGE}, must-revalidate"
+    return response.make_conditional(request)
+
+@lookup_bp.route("/batch", methods=["POST"])
+def batch_lookup_handler():
+    """Resolve many scanned codes at once and stream locations grouped by input code.
 
+    Body: {"codes": [...]} or a bare list. Each result is
+    {"code", "status", "match", "items": [{"system_id", "upc_id", "description",
+    "locations": [[shelf_id, shelf_row, item_position], ...]}]}.
+    """
+    payload = request.get_json(silent=True)
+    raw_codes = payload.get("codes") if isinstance(payload, dict) else payload
+    if not isinstance(raw_codes, list):
+        return jsonify({"status": "error", "message": "Payload must be a list of codes or {\"codes\": [...]}."}), 400
+
+    codes = list(dict.fromkeys(code for code in (empty_to_none(code) for code in raw_codes) if code))
+    if len(codes) > LOOKUP_BATCH_MAX:
+        return jsonify({"status": "error", "message": f"At most {LOOKUP_BATCH_MAX} codes per batch."}), 413
+
+    def generate():
+        with db_connection() as conn:
+            resolved = resolve_codes(conn.cursor(), codes)
+            yield '{"results":['
+
+            ordinals, system_ids = [], []
+            for ordinal, code in enumerate(codes):
+                for system_id in resolved[code][1]:
+                    ordinals.append(ordinal)
+                    system_ids.append(system_id)
+
+            with conn.cursor(name="batch_lookup") as cur:
+                cur.itersize = 2000
+                cur.execute("""
+                    SELECT c.ordinal, p.system_id, p.upc_id, p.description,
+                           i.shelf_id, i.shelf_row, i.item_position
+                    FROM unnest(%s::int[], %s::text[]) AS c(ordinal, system_id)
+                    JOIN products p ON p.system_id = c.system_id
+                    LEFT JOIN inventory i ON i.system_id = p.system_id
+                    ORDER BY c.ordinal, p.system_id, i.shelf_id, i.shelf_row, i.item_position;
+                """, (ordinals, system_ids))
+
+                groups = groupby(cur, key=lambda row: row[0])
+                pending = next(groups, None)
+                for ordinal, code in enumerate(codes):
+                    status, _, match = resolved[code]
+                    items = []
+                    if pending and pending[0] == ordinal:
+                        for system_id, rows in groupby(pending[1], key=lambda row: row[1]):
+                            rows = list(rows)
+                            items.append({
+                                "system_id": system_id,
+                                "upc_id": rows[0][2],
+                                "description": rows[0][3],
+                                "locations": [list(row[4:]) for row in rows if row[4] is not None]
+                            })
+                        pending = next(groups, None)
+                    result = {"code": code, "status": status, "match": match, "items": items}
+                    yield ("," if ordinal else "") + json.dumps(result, separators=(",", ":"))
+
+            yield "]}"
+
+    # Resolution runs before the first chunk, so database errors still get a proper status.
+    body = generate()
+    try:
+        first = next(body)
     except psycopg2.Error as e:
         return handle_db_error(e)
-    finally:
-        if conn:
-            conn.close()
+
+    def stream():
+        try:
+            yield first
+            yield from body
+        finally:
+            body.close()
+
+    return Response(stream(), mimetype="application/json")
+
+# Blueprint: Metrics API
+metrics_bp = Blueprint("metrics_api", __name__)
+
+@metrics_bp.route("", methods=["GET"])
+@require_api_key
+def metrics_handler():
+    pool = _pool if _pool_pid == os.getpid() else None
+    return jsonify({
+        "pid": os.getpid(),
+        "pool": pool.stats() if pool else None,
+        "lookup_cache": lookup_cache.stats(),
+        "timing": request_timing.stats() if REQUEST_TIMING else None
+    })
 
 # Main Flask App
 app = Flask(__name__)
+if REQUEST_TIMING:
+    app.json = TimedJSONProvider(app)
+    app.before_request(start_request_timing)
+    app.after_request(finish_request_timing)
+# With JOB_WORKERS > 0, starts this web worker's own import job runners on its
+# first request; by default jobs are left to the run-jobs process.
+app.before_request(ensure_job_runners)
 CORS(
     app,
     origins=["https://retail-item-locator.onrender.com", "http://localhost:5173"],
@@ -238,10 +1995,56 @@ CORS(
     allow_headers=["Content-Type", "Authorization"]
 )
 
+# Handlers only catch database errors; an unmigrated schema still gets the JSON error shape.
+@app.errorhandler(SchemaNotMigrated)
+def handle_schema_not_migrated(e):
+    print(f"Schema error: {e}")
+    return jsonify({"status": "error", "message": "The database schema is out of date.", "error": str(e)}), 503
+
 # Register all blueprints
 app.register_blueprint(import_bp, url_prefix="/api/import")
 app.register_blueprint(product_import_bp, url_prefix="/api/product-import")
 app.register_blueprint(lookup_bp, url_prefix="/api/lookup")
+app.register_blueprint(jobs_bp, url_prefix="/api/jobs")
+app.register_blueprint(metrics_bp, url_prefix="/api/metrics")
+
+# Maintenance commands, run before starting or upgrading the web workers.
+@app.cli.command("migrate")
+def migrate_command():
+    """Apply pending schema migrations."""
+    if not DATABASE_URL:
+        raise ValueError("DATABASE_URL not set")
+    conn = psycopg2.connect(DATABASE_URL)
+    try:
+        migrate_schema(conn)
+    finally:
+        conn.close()
+    print(f"Schema is at version {SCHEMA_VERSION}")
+
+@app.cli.command("run-jobs")
+@click.option("--workers", default=2, show_default=True, help="Runner threads in this process.")
+def run_jobs_command(workers):
+    """Run import job runners in the foreground, for a dedicated worker process."""
+    if not DATABASE_URL:
+        raise ValueError("DATABASE_URL not set")
+    if workers <= 0:
+        raise SystemExit("--workers must be at least 1.")
+    ensure_job_runners(workers)
+    while True:
+        time.sleep(JOB_POLL_SECONDS)
+
+@app.cli.command("rebuild-code-index")
+def rebuild_code_index_command():
+    """Rebuild product_codes from products, e.g. after bulk edits made outside the app."""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM product_codes;")
+        rebuild_code_index(conn)
+        conn.commit()
+    finally:
+        conn.close()
+    print("Rebuilt product_codes")
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,341 @@
+# benchmark.py
+"""Benchmark harness for the lookup and import endpoints.
+
+Seed a local Postgres with a synthetic catalog, then drive lookup mixes and
+bulk imports and report throughput with p50/p95/p99 latency per workload.
+
+    export DATABASE_URL=postgresql://localhost/locator_bench API_KEY=bench
+    python benchmark.py seed --products 100000 --reset
+    python benchmark.py lookup --products 100000 --requests 5000 --concurrency 8
+    python benchmark.py import --products 100000 --rows 20000 --batch 1000
+
+Requests go through the in-process Flask test client by default; pass
+--base-url http://localhost:5000 to drive a running server instead. Run the
+server with REQUEST_TIMING=1 to also get mean database time per workload from
+the Server-Timing headers. Products are derived deterministically from their
+index, so lookup and import runs only need the --products count used to seed.
+"""
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+import psycopg2
+
+import app as locator
+from codes import gtin_check_digit
+
+BASE_SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS products (
+        system_id TEXT PRIMARY KEY,
+        upc_id TEXT,
+        custom_sku TEXT,
+        ean TEXT,
+        manufacture_sku TEXT,
+        description TEXT,
+        price NUMERIC,
+        category TEXT,
+        subcat_1 TEXT,
+        subcat_2 TEXT,
+        subcat_3 TEXT,
+        brand TEXT
+    );
+    CREATE TABLE IF NOT EXISTS inventory (
+        system_id TEXT NOT NULL,
+        shelf_id TEXT NOT NULL,
+        shelf_row TEXT NOT NULL,
+        item_position INTEGER,
+        UNIQUE (system_id, shelf_id, shelf_row)
+    );
+"""
+
+BRANDS = ["Acme", "Northwind", "Contoso", "Globex", "Initech", "Umbrella", "Stark", "Wayne", "Hooli", "Vandelay"]
+ADJECTIVES = ["Galvanized", "Stainless", "Heavy Duty", "Brass", "Zinc", "Coated", "Black", "Mini", "Pro", "Outdoor"]
+NOUNS = ["Bolt", "Hinge", "Hammer", "Wrench", "Bracket", "Anchor", "Washer", "Clamp", "Screw", "Hook", "Cable", "Tape"]
+CATEGORIES = ["Hardware", "Tools", "Plumbing", "Electrical", "Garden"]
+SHELF_ROWS = ["TOP", "MIDDLE", "LOW"]
+AISLES = 40
+
+LOOKUP_KINDS = ("exact", "padded", "sku", "description", "search")
+DEFAULT_LOOKUP_MIX = "exact=40,padded=20,sku=20,description=10,search=10"
+
+# Synthetic Data
+def synthetic_product(i, revision=0):
+    """Product i as a dict keyed by locator.PRODUCT_COLUMNS; revision bumps the price."""
+    rng = random.Random(i)
+    body = f"0{i:010d}"
+    upc = body + gtin_check_digit(body)
+    category = rng.choice(CATEGORIES)
+    return {
+        "system_id": str(210000000000 + i),
+        "upc_id": upc,
+        "custom_sku": f"SKU-{i:07d}",
+        "ean": "0" + upc,
+        "manufacture_sku": f"M{rng.randrange(16 ** 6):06X}-{i}",
+        "description": f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {rng.randrange(1, 64)}mm",
+        "price": round(rng.uniform(0.5, 150) + revision, 2),
+        "category": category,
+        "subcat_1": f"{category} {rng.randrange(1, 9)}",
+        "subcat_2": None,
+        "subcat_3": None,
+        "brand": rng.choice(BRANDS),
+    }
+
+def synthetic_locations(i, per_product):
+    # 17 is coprime with AISLES, so one product never lands twice in the same aisle.
+    for j in range(min(per_product, AISLES)):
+        aisle = (i + j * 17) % AISLES + 1
+        yield (str(210000000000 + i), f"Aisle {aisle}", SHELF_ROWS[(i + j) % 3], (i * 7 + j) % 60 + 1)
+
+def seed(args):
+    with psycopg2.connect(locator.DATABASE_URL) as conn:
+        conn.cursor().execute(BASE_SCHEMA_SQL)
+    conn.close()
+
+    conn = psycopg2.connect(locator.DATABASE_URL)
+    try:
+        locator.migrate_schema(conn)
+    finally:
+        conn.close()
+
+    conn = locator.get_db_connection()
+    try:
+        cur = conn.cursor()
+        if args.reset:
+            cur.execute("TRUNCATE inventory, products, product_codes;")
+        else:
+            cur.execute("SELECT EXISTS (SELECT 1 FROM products);")
+            if cur.fetchone()[0]:
+                raise SystemExit("products is not empty; pass --reset to replace it.")
+
+        start = time.perf_counter()
+        products = (
+            tuple(synthetic_product(i)[column] for column in locator.PRODUCT_COLUMNS)
+            for i in range(args.products)
+        )
+        cur.copy_expert(
+            f"COPY products ({', '.join(locator.PRODUCT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            locator.CopyRowStream(products)
+        )
+        locations = (
+            location
+            for i in range(args.products)
+            for location in synthetic_locations(i, args.locations_per_product)
+        )
+        cur.copy_expert(
+            "COPY inventory (system_id, shelf_id, shelf_row, item_position) FROM STDIN WITH (FORMAT csv)",
+            locator.CopyRowStream(locations)
+        )
+        locator.rebuild_code_index(conn)
+        conn.commit()
+
+        conn.autocommit = True
+        cur.execute("ANALYZE products; ANALYZE inventory; ANALYZE product_codes;")
+        print(f"Seeded {args.products} products in {time.perf_counter() - start:.1f}s")
+    finally:
+        conn.close()
+
+# Clients
+class InProcessClient:
+    def __init__(self):
+        self._local = threading.local()
+
+    def request(self, method, path, body=None, headers=None):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = locator.app.test_client()
+        response = client.open(path, method=method, data=body, headers=headers or {})
+        return response.status_code, response.headers.get("Server-Timing")
+
+class HttpClient:
+    """Keeps one keep-alive connection per thread."""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.netloc = parts.netloc
+        self._local = threading.local()
+
+    def request(self, method, path, body=None, headers=None):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self.connection_class(self.netloc, timeout=60)
+        try:
+            conn.request(method, path, body=body, headers=headers or {})
+            response = conn.getresponse()
+            response.read()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            self._local.conn = None
+            raise
+        return response.status, response.getheader("Server-Timing")
+
+def server_db_ms(server_timing):
+    if not server_timing:
+        return None
+    for metric in server_timing.split(","):
+        name, *params = metric.strip().split(";")
+        if name == "db":
+            for param in params:
+                if param.startswith("dur="):
+                    return float(param[4:])
+    return None
+
+# Runner
+def run_requests(client, requests, concurrency):
+    """Issue (kind, method, path, body, headers, rows) requests; returns (samples, wall_seconds)."""
+    def issue(spec):
+        kind, method, path, body, headers, rows = spec
+        start = time.perf_counter()
+        try:
+            status, server_timing = client.request(method, path, body, headers)
+        except (http.client.HTTPException, OSError):
+            status, server_timing = None, None
+        return kind, (time.perf_counter() - start) * 1000, status, server_db_ms(server_timing), rows
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(issue, requests))
+    return samples, time.perf_counter() - start
+
+def summarize(samples, wall_seconds):
+    report = {}
+    for kind in dict.fromkeys(sample[0] for sample in samples):
+        kind_samples = [sample for sample in samples if sample[0] == kind]
+        latencies = sorted(sample[1] for sample in kind_samples)
+        db_times = [sample[3] for sample in kind_samples if sample[3] is not None]
+        rows = sum(sample[4] for sample in kind_samples)
+        report[kind] = {
+            "requests": len(kind_samples),
+            "errors": sum(1 for sample in kind_samples if sample[2] is None or sample[2] >= 400),
+            "requests_per_sec": round(len(kind_samples) / wall_seconds, 1),
+            "rows_per_sec": round(rows / wall_seconds, 1),
+            "p50_ms": round(locator.percentile(latencies, 50), 2),
+            "p95_ms": round(locator.percentile(latencies, 95), 2),
+            "p99_ms": round(locator.percentile(latencies, 99), 2),
+            "mean_db_ms": round(sum(db_times) / len(db_times), 2) if db_times else None,
+        }
+    return report
+
+def print_report(title, report, wall_seconds, as_json):
+    if as_json:
+        print(json.dumps({"benchmark": title, "wall_seconds": round(wall_seconds, 2), "results": report}, indent=2))
+        return
+    print(f"\n{title} ({wall_seconds:.1f}s)")
+    columns = ["requests", "errors", "requests_per_sec", "rows_per_sec", "p50_ms", "p95_ms", "p99_ms", "mean_db_ms"]
+    print(f"{'workload':<14}" + "".join(f"{column:>17}" for column in columns))
+    for kind, stats in report.items():
+        print(f"{kind:<14}" + "".join(f"{str(stats[column]):>17}" for column in columns))
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in LOOKUP_KINDS:
+            raise SystemExit(f"Unknown lookup kind {kind!r}; choose from {', '.join(LOOKUP_KINDS)}.")
+        weights[kind] = float(weight or 1)
+    return weights
+
+def lookup_query(kind, product, rng):
+    if kind == "exact":
+        return {"q": product["upc_id"]}
+    if kind == "padded":
+        return {"q": product["upc_id"].zfill(14)}
+    if kind == "sku":
+        return {"q": product["custom_sku"]}
+    if kind == "description":
+        return {"q": rng.choice(product["description"].split()[:-1])}
+    return {"q": product["description"].split()[-2][:3], "mode": "search", "limit": 20}
+
+def lookup(args):
+    rng = random.Random(args.seed)
+    weights = parse_mix(args.mix)
+    kinds = rng.choices(list(weights), weights=list(weights.values()), k=args.requests)
+    requests = []
+    for kind in kinds:
+        # A small hot set mirrors staff rescanning the same SKUs all day.
+        hot = rng.random() < args.hot_ratio
+        i = rng.randrange(min(args.hot_set, args.products) if hot else args.products)
+        params = lookup_query(kind, synthetic_product(i), rng)
+        requests.append((kind, "GET", f"/api/lookup?{urlencode(params)}", None, None, 1))
+
+    client = make_client(args)
+    samples, wall_seconds = run_requests(client, requests, args.concurrency)
+    print_report("lookup", summarize(samples, wall_seconds), wall_seconds, args.json)
+
+def bulk_import(args):
+    rng = random.Random(args.seed)
+    headers = {"Content-Type": "application/json", "X-API-Key": locator.API_KEY or ""}
+    requests = []
+    if args.kind in ("products", "both"):
+        for start in range(0, args.rows, args.batch):
+            rows = min(args.batch, args.rows - start)
+            payload = []
+            for _ in range(rows):
+                product = synthetic_product(rng.randrange(args.products), revision=int(rng.random() < args.change_rate))
+                product["upc"] = product.pop("upc_id")
+                payload.append(product)
+            requests.append(("product-import", "POST", "/api/product-import", json.dumps(payload), headers, rows))
+    if args.kind in ("locations", "both"):
+        for start in range(0, args.rows, args.batch):
+            rows = min(args.batch, args.rows - start)
+            shelf_id = f"Bench {start // args.batch}"
+            payload = [
+                {
+                    "upc": synthetic_product(rng.randrange(args.products))["upc_id"],
+                    "shelf_id": shelf_id,
+                    "shelf_row": rng.choice(SHELF_ROWS),
+                    "item_position": position + 1,
+                }
+                for position in range(rows)
+            ]
+            requests.append(("import", "POST", "/api/import", json.dumps(payload), headers, rows))
+
+    client = make_client(args)
+    samples, wall_seconds = run_requests(client, requests, args.concurrency)
+    print_report("import", summarize(samples, wall_seconds), wall_seconds, args.json)
+
+def make_client(args):
+    return HttpClient(args.base_url) if args.base_url else InProcessClient()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = subparsers.add_parser("seed", help="Load a synthetic catalog and inventory with COPY.")
+    seed_parser.add_argument("--products", type=int, default=10000)
+    seed_parser.add_argument("--locations-per-product", type=int, default=1)
+    seed_parser.add_argument("--reset", action="store_true", help="Truncate products, inventory and product_codes first.")
+    seed_parser.set_defaults(func=seed)
+
+    for name, func, help_text in (
+        ("lookup", lookup, "Drive a weighted mix of lookups."),
+        ("import", bulk_import, "Drive batched product and location imports."),
+    ):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("--products", type=int, default=10000, help="Catalog size used when seeding.")
+        sub.add_argument("--concurrency", type=int, default=4)
+        sub.add_argument("--base-url", help="Drive a running server instead of the in-process test client.")
+        sub.add_argument("--seed", type=int, default=1)
+        sub.add_argument("--json", action="store_true", help="Print the report as JSON.")
+        sub.set_defaults(func=func)
+        if name == "lookup":
+            sub.add_argument("--requests", type=int, default=2000)
+            sub.add_argument("--mix", default=DEFAULT_LOOKUP_MIX, help=f"Weighted kinds from {', '.join(LOOKUP_KINDS)}.")
+            sub.add_argument("--hot-set", type=int, default=2000, help="Size of the frequently scanned product set.")
+            sub.add_argument("--hot-ratio", type=float, default=0.8, help="Share of lookups drawn from the hot set.")
+        else:
+            sub.add_argument("--kind", choices=("products", "locations", "both"), default="both")
+            sub.add_argument("--rows", type=int, default=10000)
+            sub.add_argument("--batch", type=int, default=1000)
+            sub.add_argument("--change-rate", type=float, default=0.1, help="Share of re-synced products with a new price.")
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+# codes.py
+# Canonical keys for product identifiers. Scans resolve with an indexed equality
+# probe on these keys instead of a leading-wildcard ILIKE scan:
+#   s:<lowercased code>         exact code, case-insensitive
+#   d:<digits without leading zeros>
+#   g:<GTIN-14 with check digit> UPC-A/EAN-13/EAN-8, with or without the check digit
+KEY_TIERS = {"s": 1, "d": 2, "g": 2}
+
+def gtin_check_digit(body):
+    total = sum(int(d) * (3 if i % 2 == 0 else 1) for i, d in enumerate(reversed(body)))
+    return str((10 - total % 10) % 10)
+
+def code_keys(value):
+    code = str(value).strip() if value is not None else ""
+    if not code:
+        return set()
+
+    keys = {"s:" + code.lower()}
+    if code.isdigit():
+        keys.add("d:" + (code.lstrip('0') or '0'))
+        if len(code) in (8, 12, 13, 14) and gtin_check_digit(code[:-1]) == code[-1]:
+            keys.add("g:" + code.zfill(14))
+        elif len(code) in (7, 11, 12):
+            keys.add("g:" + (code + gtin_check_digit(code)).zfill(14))
+    return keys
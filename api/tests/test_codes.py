@@ -0,0 +1,63 @@
+import pytest
+
+from codes import code_keys, gtin_check_digit
+
+
+@pytest.mark.parametrize("body, digit", [
+    ("9638507", "4"),
+    ("03600029145", "2"),
+    ("400638133393", "1"),
+    ("0003600029145", "2"),
+])
+def test_gtin_check_digit(body, digit):
+    assert gtin_check_digit(body) == digit
+
+
+@pytest.mark.parametrize("code, gtin", [
+    ("96385074", "g:00000096385074"),        # EAN-8
+    ("036000291452", "g:00036000291452"),    # UPC-A
+    ("4006381333931", "g:04006381333931"),   # EAN-13
+    ("00036000291452", "g:00036000291452"),  # GTIN-14
+])
+def test_code_with_check_digit(code, gtin):
+    assert gtin in code_keys(code)
+
+
+@pytest.mark.parametrize("code, gtin", [
+    ("9638507", "g:00000096385074"),         # EAN-8 body
+    ("03600029145", "g:00036000291452"),     # UPC-A body
+    ("400638133393", "g:04006381333931"),    # EAN-13 body
+])
+def test_code_without_check_digit(code, gtin):
+    assert gtin in code_keys(code)
+
+
+def test_zero_padded_codes_share_keys():
+    padded = ["36000291452", "036000291452", "0036000291452", "00036000291452"]
+    for code in padded:
+        assert "d:36000291452" in code_keys(code)
+    for code in padded[1:]:
+        assert "g:00036000291452" in code_keys(code)
+
+
+def test_invalid_check_digit_has_no_gtin_key():
+    keys = code_keys("4006381333932")
+    assert not any(key.startswith("g:") for key in keys)
+    assert keys == {"s:4006381333932", "d:4006381333932"}
+
+
+def test_unsupported_length_has_no_gtin_key():
+    assert not any(key.startswith("g:") for key in code_keys("123456"))
+
+
+def test_sku_is_case_insensitive():
+    assert code_keys(" AB-12x ") == {"s:ab-12x"}
+
+
+def test_all_zero_code():
+    assert "d:0" in code_keys("0000")
+
+
+@pytest.mark.parametrize("value", [None, "", "   "])
+def test_empty_codes(value):
+    assert code_keys(value) == set()
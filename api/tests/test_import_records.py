@@ -0,0 +1,75 @@
+import csv
+import io
+
+import pytest
+
+from app import CopyRowStream, ImportProgress, iter_import_records, parse_product_record
+
+
+def records(body, content_type):
+    return list(iter_import_records(io.BytesIO(body), content_type))
+
+
+def test_csv_records_with_bom_and_line_numbers():
+    body = "\ufeffSystem ID,UPC,Item\n210000000001,036000291452,Tea\n210000000002,,Milk\n".encode("utf-8")
+    assert records(body, "text/csv") == [
+        (2, {"System ID": "210000000001", "UPC": "036000291452", "Item": "Tea"}, None),
+        (3, {"System ID": "210000000002", "UPC": "", "Item": "Milk"}, None),
+    ]
+
+
+def test_malformed_csv_row_is_rejected_alone():
+    limit = csv.field_size_limit(20)
+    try:
+        body = b"system_id,Item\n1,ok\n2," + b"x" * 50 + b"\n3,fine\n"
+        result = records(body, "text/csv")
+    finally:
+        csv.field_size_limit(limit)
+
+    assert [line for line, _, _ in result] == [2, 3, 4]
+    assert result[1][1] is None and result[1][2].startswith("Malformed CSV row")
+    assert result[2][1] == {"system_id": "3", "Item": "fine"}
+
+
+def test_ndjson_rejects():
+    body = b'{"system_id": "1"}\n\n[1]\nnot json\n{"system_id": "2"}'
+    result = records(body, "application/x-ndjson")
+    assert [(line, error is None) for line, _, error in result] == [
+        (1, True), (3, False), (4, False), (5, True)
+    ]
+    assert result[1][2] == "Row is not a JSON object."
+    assert result[2][2].startswith("Invalid JSON")
+
+
+def test_progress_counts_rejects():
+    progress = ImportProgress("test")
+    rows = list(progress.staged_rows([
+        (1, {"system_id": " 1 ", "Price": "$2.50"}, None),
+        (2, None, "Invalid JSON"),
+        (3, {"Item": "no id"}, None),
+    ]))
+    assert len(rows) == 1 and rows[0][:2] == (1, "1")
+    assert (progress.received, progress.staged, progress.rejected) == (3, 1, 2)
+    assert progress.rejects == [
+        {"line": 2, "message": "Invalid JSON"},
+        {"line": 3, "message": "Missing system_id."},
+    ]
+
+
+def test_parse_product_record_aliases_and_price():
+    row = parse_product_record({"system_id": "7", "upc": " 036000291452 ", "Price": "$1,299.00", "Brand": ""})
+    assert row == ("7", "036000291452", None, None, None, None, 1299.0, None, None, None, None, None)
+    with pytest.raises(ValueError):
+        parse_product_record({"system_id": "7", "price": "free"})
+
+
+def test_copy_row_stream_reads_in_pieces():
+    stream = CopyRowStream(iter([("1", 'a "quoted", value', None), ("2", "b", 3)]))
+    data = ""
+    while True:
+        piece = stream.read(5)
+        if not piece:
+            break
+        assert len(piece) <= 5
+        data += piece
+    assert data == '1,"a ""quoted"", value",\n2,b,3\n'
@@ -0,0 +1,115 @@
+import re
+
+import pytest
+
+import app as locator
+
+
+def set_columns(sql):
+    """Columns assigned by an UPDATE's SET clause, split at top-level commas."""
+    clause = re.search(r"\bSET\b(.*?)\bWHERE\b", sql, re.S).group(1)
+    columns, depth, start = [], 0, 0
+    for i, char in enumerate(clause + ","):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            columns.append(clause[start:i].split("=")[0].strip())
+            start = i + 1
+    return columns
+
+
+class FakeCursor:
+    """Serves scripted import_job_rows chunks and records import_jobs updates."""
+
+    def __init__(self, chunks, lease_held=True):
+        self.chunks = list(chunks)
+        self.lease_held = lease_held
+        self.updates = []
+        self.rowcount = -1
+        self._result = []
+
+    def execute(self, sql, args=None):
+        if "FROM import_job_rows" in sql and sql.lstrip().startswith("SELECT"):
+            self._result = self.chunks.pop(0) if self.chunks else []
+        elif sql.lstrip().startswith("UPDATE import_jobs"):
+            columns = set_columns(sql)
+            # Postgres rejects "multiple assignments to same column".
+            assert len(columns) == len(set(columns)), columns
+            assert sql.count("%s") == len(args)
+            self.updates.append((dict.fromkeys(columns), args))
+            self.rowcount = 1 if self.lease_held else 0
+
+    def fetchall(self):
+        return self._result
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+@pytest.fixture
+def chunk_results(monkeypatch):
+    results = []
+
+    def process_job_chunk(cur, kind, rows):
+        outcome = results.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(locator, "process_job_chunk", process_job_chunk)
+    return results
+
+
+def test_job_runs_to_succeeded(chunk_results):
+    rows = [(0, 2, {"system_id": "1"}, None), (1, 3, {"system_id": "2"}, None)]
+    cur = FakeCursor([rows])
+    conn = FakeConnection(cur)
+    chunk_results.append(({"inserted": 2, "updated": 0, "unchanged": 0}, set(), set(), []))
+
+    locator.run_job(conn, "token", 7, "product-import", 0, False)
+
+    (chunk_columns, chunk_args), (final_columns, final_args) = cur.updates
+    assert "lease_expires_at" in chunk_columns
+    assert chunk_args[0] == 2 and chunk_args[-2:] == (7, "token")
+    assert "status" in final_columns and "lease_token" in final_columns
+    assert final_args == (None, 7, "token")
+    assert conn.commits == 2 and conn.rollbacks == 0
+
+
+def test_job_failure_marks_failed(chunk_results):
+    cur = FakeCursor([[(0, 2, {"system_id": "1"}, None)]])
+    conn = FakeConnection(cur)
+    chunk_results.append(RuntimeError("boom"))
+
+    locator.run_job(conn, "token", 7, "product-import", 0, False)
+
+    (columns, args), = cur.updates
+    assert "status" in columns and "lease_expires_at" in columns
+    assert args == ("boom", 7, "token")
+    assert conn.rollbacks == 1 and conn.commits == 1
+
+
+def test_lost_lease_rolls_back_without_marking(chunk_results):
+    cur = FakeCursor([[(0, 2, {"system_id": "1"}, None)]], lease_held=False)
+    conn = FakeConnection(cur)
+    chunk_results.append(({"inserted": 1, "updated": 0, "unchanged": 0}, set(), set(), []))
+
+    locator.run_job(conn, "token", 7, "product-import", 0, False)
+
+    assert len(cur.updates) == 1
+    assert conn.commits == 0 and conn.rollbacks == 1
@@ -0,0 +1,76 @@
+from app import LookupCache
+
+
+def make_cache(max_size=10, max_bytes=1000, max_entry_bytes=100):
+    return LookupCache(max_size, 60, max_bytes, max_entry_bytes)
+
+
+def test_invalidate_by_system_id_keeps_unrelated_entries():
+    cache = make_cache()
+    cache.put("a", b"[1]", ["1"], cache.generation)
+    cache.put("b", b"[2]", ["2"], cache.generation)
+
+    cache.invalidate(["1"])
+
+    assert cache.get("a") is None
+    assert cache.get("b")["body"] == b"[2]"
+
+
+def test_invalidate_by_code_key():
+    cache = make_cache()
+    cache.put("a", b"[1]", ["1"], cache.generation, {"s:036000291452", "g:00036000291452"})
+    cache.put("b", b"[2]", ["2"], cache.generation, {"s:abc"})
+
+    # A product that did not appear in the result gained the code.
+    cache.invalidate(["99"], {"g:00036000291452"})
+
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+
+
+def test_fuzzy_entries_drop_on_any_invalidation():
+    cache = make_cache()
+    cache.put("fuzzy", b"[]", None, cache.generation)
+    cache.put("exact", b"[1]", ["1"], cache.generation)
+
+    cache.invalidate(["2"])
+
+    assert cache.get("fuzzy") is None
+    assert cache.get("exact") is not None
+
+
+def test_invalidate_everything():
+    cache = make_cache()
+    cache.put("a", b"[1]", ["1"], cache.generation)
+    cache.invalidate()
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_put_after_invalidation_race_is_not_cached():
+    cache = make_cache()
+    generation = cache.generation
+    cache.invalidate(["1"])
+    cache.put("a", b"[1]", ["1"], generation)
+    assert cache.get("a") is None
+
+
+def test_oversized_bodies_are_skipped():
+    cache = make_cache(max_entry_bytes=4)
+    entry = cache.put("big", b"[1,2,3]", ["1"], cache.generation)
+    assert entry["body"] == b"[1,2,3]"
+    assert cache.get("big") is None
+    assert cache.stats()["skipped"] == 1
+
+
+def test_byte_budget_evicts_least_recently_used():
+    cache = make_cache(max_bytes=8)
+    cache.put("a", b"1234", ["1"], cache.generation)
+    cache.put("b", b"1234", ["2"], cache.generation)
+    cache.get("a")
+    cache.put("c", b"1234", ["3"], cache.generation)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["bytes"] == 8
+    assert cache.stats()["evictions"] == 1
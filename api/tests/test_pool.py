@@ -0,0 +1,52 @@
+import psycopg2.pool
+import pytest
+
+import app as locator
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture(autouse=True)
+def fake_connections(monkeypatch):
+    monkeypatch.setattr(locator, "get_db_connection", FakeConnection)
+
+
+def make_pool(**kwargs):
+    options = dict(min_size=0, max_size=2, idle_timeout=300, checkout_timeout=0.05, health_check=False)
+    options.update(kwargs)
+    return locator.ConnectionPool(**options)
+
+
+def test_connections_are_reused():
+    pool = make_pool()
+    conn = pool.getconn()
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+    assert pool.stats()["created"] == 1
+
+
+def test_checkout_times_out_at_max_size():
+    pool = make_pool()
+    pool.getconn()
+    pool.getconn()
+    with pytest.raises(psycopg2.pool.PoolError):
+        pool.getconn()
+    assert pool.stats()["in_use"] == 2
+
+
+def test_discarded_connections_free_their_slot():
+    pool = make_pool(max_size=1)
+    conn = pool.getconn()
+    pool.putconn(conn, discard=True)
+    assert conn.closed
+    assert pool.getconn() is not conn
+    assert pool.stats()["closed"] == 1
@@ -0,0 +1,17 @@
+from contextlib import contextmanager
+
+import app as locator
+
+
+def test_unmigrated_schema_returns_json_error(monkeypatch):
+    @contextmanager
+    def db_connection():
+        raise locator.SchemaNotMigrated("Database schema is at version 0, expected 5.")
+        yield
+
+    monkeypatch.setattr(locator, "db_connection", db_connection)
+    response = locator.app.test_client().get("/api/lookup?q=036000291452")
+
+    assert response.status_code == 503
+    assert response.get_json()["status"] == "error"
+    assert "version 0" in response.get_json()["error"]
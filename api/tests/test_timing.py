@@ -0,0 +1,15 @@
+import pytest
+
+from app import percentile
+
+
+@pytest.mark.parametrize("values, pct, expected", [
+    ([1, 2, 3, 4, 5], 50, 3),
+    ([1, 2, 3, 4], 50, 2),
+    ([1, 2, 3, 4, 5], 95, 5),
+    (list(range(1, 101)), 99, 99),
+    ([7], 1, 7),
+    ([], 50, None),
+])
+def test_nearest_rank_percentile(values, pct, expected):
+    assert percentile(values, pct) == expected
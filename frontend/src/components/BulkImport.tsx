@@ -1,7 +1,11 @@
 // src/components/BulkImport.tsx
 import React, { useState, useRef } from "react";
 import type { KeyboardEvent, ChangeEvent } from "react";
-import type { ImportPayload, RawLocationCSVRow } from "../types";
+import type {
+  ImportPayload,
+  ImportResponse,
+  RawLocationCSVRow,
+} from "../types";
 import Papa from "papaparse";
 
 const API_IMPORT_URL =
@@ -82,14 +86,22 @@ const BulkImport: React.FC = () => {
         body: JSON.stringify(payloads),
       });
 
-      const data = await response.json();
+      const data: ImportResponse = await response.json();
 
       if (response.ok) {
         // Determine the next starting position after the import
         const newStartingPosition = position + payloads.length;
+        const summary = data.summary;
+        const skipped = summary
+          ? summary.ambiguous + summary.unmatched + summary.invalid
+          : 0;
         setStatus({
-          message: `Success! Assigned ${payloads.length} items starting at POS ${position}. Next scan/start: ${newStartingPosition}`,
-          type: "success",
+          message:
+            `Success! Assigned ${summary ? summary.resolved : payloads.length} items starting at POS ${position}. Next scan/start: ${newStartingPosition}` +
+            (skipped > 0
+              ? ` (${summary?.ambiguous} ambiguous, ${summary?.unmatched} unmatched, ${summary?.invalid} invalid codes skipped)`
+              : ""),
+          type: skipped > 0 ? "conflict" : "success",
         });
 
         setPosition(newStartingPosition);
@@ -1,11 +1,11 @@
 // src/components/ProductImport.tsx
 import React, { useState } from "react";
 import type { ChangeEvent } from "react";
-import type { RawProductCSVRow, ProductPayload } from "../types";
-import Papa from "papaparse";
+import type { ImportJob } from "../types";
 
-const API_IMPORT_URL =
-  "https://retail-item-locator-api.onrender.com/api/product-import";
+const API_JOBS_URL = "https://retail-item-locator-api.onrender.com/api/jobs";
+const JOB_POLL_INTERVAL_MS = 1500;
+const JOB_POLL_TIMEOUT_MS = 30 * 60 * 1000;
 
 // Helper function to dynamically apply CSS classes for status messages
 const getStatusClasses = (
@@ -41,95 +41,104 @@ const ProductImport: React.FC = () => {
     }
   };
 
-  const handleImport = () => {
+  /**
+   * Polls the import job until it finishes, reporting progress as it goes.
+   * Gives up after JOB_POLL_TIMEOUT_MS and returns the last status seen, so a
+   * stalled job never leaves the page polling forever.
+   * @param jobId The id returned when the file was submitted.
+   */
+  const pollJob = async (jobId: number): Promise<ImportJob> => {
+    const deadline = Date.now() + JOB_POLL_TIMEOUT_MS;
+    for (;;) {
+      const response = await fetch(`${API_JOBS_URL}/${jobId}`);
+      const job: ImportJob = await response.json();
+      if (!response.ok) {
+        throw new Error(job.message || `Job ${jobId} could not be loaded.`);
+      }
+      if (
+        job.status === "succeeded" ||
+        job.status === "failed" ||
+        Date.now() >= deadline
+      ) {
+        return job;
+      }
+      setStatus({
+        message: `Importing... ${job.processed_rows} of ${job.total_rows} rows${
+          job.throughput_rows_per_sec
+            ? ` (${job.throughput_rows_per_sec} rows/s)`
+            : ""
+        }`,
+        type: "loading",
+      });
+      await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+    }
+  };
+
+  const handleImport = async () => {
     if (!importFile) {
       setStatus({ message: "Error: Please select a CSV file.", type: "error" });
       return;
     }
 
     setLoading(true);
-    setStatus({ message: `Parsing ${importFile.name}...`, type: "loading" });
-
-    Papa.parse(importFile, {
-      header: true,
-      skipEmptyLines: true,
-      complete: async (results) => {
-        const rawData: RawProductCSVRow[] = results.data as RawProductCSVRow[];
-
-        const productPayloads: ProductPayload[] = rawData
-          .map((row) => {
-            // Crucial: Check for the primary key (UPC)
-            const upc = String(row.UPC || "").trim();
-            if (upc.length === 0) {
-              console.warn("Skipping row with missing UPC:", row);
-              return null;
-            }
-
-            // Map and clean all fields, including the new EAN and Manufacturer SKU
-            return {
-              upc: upc,
-              description: String(row.Item || "").trim(),
-              // Robust price parsing: remove non-numeric chars except '.' and parse as float
-              price:
-                parseFloat(String(row.Price || "0").replace(/[^0-9.]/g, "")) ||
-                0.0,
-              category: String(row.Category || "").trim(),
-              brand: String(row.Brand || "").trim(),
-              custom_sku: String(row["Custom SKU"] || "").trim(),
-              ean: String(row.EAN || "").trim(),
-              manufacture_sku: String(row["Manufact. SKU"] || "").trim(),
-              system_id: String(row["System ID"] || "").trim(),
-            } as ProductPayload;
-          })
-          .filter((p): p is ProductPayload => p !== null);
-
-        if (productPayloads.length === 0) {
-          setLoading(false);
-          return setStatus({
-            message: "Error: No valid product records found to import.",
-            type: "error",
-          });
-        }
-
-        // --- API Submission ---
-        try {
-          const response = await fetch(API_IMPORT_URL, {
-            method: "POST",
-            headers: { "Content-Type": "application/json" },
-            body: JSON.stringify(productPayloads),
-          });
-
-          const data = await response.json();
-
-          if (response.ok) {
-            setStatus({
-              message: `Success! Imported/updated ${productPayloads.length} product records.`,
-              type: "success",
-            });
-            setImportFile(null); // Clear file input on success
-          } else {
-            // The server response should contain a detailed message on failure
-            setStatus({
-              message: `Server Error: ${data.message || "Check server logs."}`,
-              type: "error",
-            });
-          }
-        } catch (e) {
-          setStatus({
-            message:
-              "Connection Error: Ensure Flask server is running and accessible.",
-            type: "error",
-          });
-          console.error("Import Error:", e);
-        } finally {
-          setLoading(false);
-        }
-      },
-      error: (err) => {
-        setLoading(false);
-        setStatus({ message: `Parsing Failed: ${err.message}`, type: "error" });
-      },
-    });
+    setStatus({ message: `Uploading ${importFile.name}...`, type: "loading" });
+
+    // --- API Submission ---
+    // The raw CSV is queued as a background job on the server and polled for progress.
+    try {
+      const response = await fetch(`${API_JOBS_URL}/product-import`, {
+        method: "POST",
+        headers: { "Content-Type": "text/csv" },
+        body: importFile,
+      });
+
+      const data = await response.json();
+
+      if (!response.ok) {
+        // The server response should contain a detailed message on failure
+        setStatus({
+          message: `Server Error: ${data.message || "Check server logs."}`,
+          type: "error",
+        });
+        return;
+      }
+
+      const job = await pollJob(data.job_id);
+      if (job.status === "queued" || job.status === "running") {
+        setStatus({
+          message: `Import job ${job.id} is still ${job.status} (${job.processed_rows} of ${job.total_rows} rows). It will keep running on the server; check back later.`,
+          type: "conflict",
+        });
+        return;
+      }
+      if (job.status === "failed") {
+        setStatus({
+          message: `Import job ${job.id} failed after ${job.processed_rows} rows: ${job.message}`,
+          type: "error",
+        });
+        return;
+      }
+
+      setStatus({
+        message:
+          `Success! ${job.inserted_rows} new, ${job.updated_rows} updated, ${job.unchanged_rows} unchanged product records.` +
+          (job.error_count ? ` ${job.error_count} rows rejected.` : ""),
+        type: job.error_count ? "conflict" : "success",
+      });
+      if (job.errors.length) {
+        console.warn("Rejected product rows:", job.errors);
+      }
+      setImportFile(null); // Clear file input on success
+    } catch (e) {
+      setStatus({
+        message:
+          "Connection Error: Ensure Flask server is running and accessible.",
+        type: "error",
+      });
+      console.error("Import Error:", e);
+    } finally {
+      setLoading(false);
+    }
   };
 
   return (
@@ -173,9 +182,7 @@ const ProductImport: React.FC = () => {
             })`}
       </button>
 
-      <p className={getStatusClasses(status.type)}>
-        {loading ? "Processing..." : status.message}
-      </p>
+      <p className={getStatusClasses(status.type)}>{status.message}</p>
     </div>
   );
 };
@@ -10,37 +10,28 @@ export const AppViewName = {
     BulkLocationImport: 'BULK_LOCATION_IMPORT' as AppView,
     ProductMasterImport: 'PRODUCT_MASTER_IMPORT' as AppView,
 };
-// RAW PRODUCT CSV ROW (Matching EXACT CSV Headers)
-export interface RawProductCSVRow {
-    UPC: string;
-    Item: string;
-    Price: string;
-    Category: string;
-    Brand: string;
-    "Custom SKU": string;       
-    EAN: string;
-    "Manufact. SKU": string;    
-    "System ID": string;  
-    "Subcategory 1": string;
-    "Subcategory 2": string;
-    "Subcategory 3": string;
-}
-
-
-// PRODUCT IMPORT PAYLOAD (Sent to /api/product-import)
-export interface ProductPayload {
-    system_id: string;
-    upc: string;            
-    description: string;    
-    price: number;
-    category: string;
-    brand: string;
-    custom_sku: string;     
-    ean: string;            
-    manufacture_sku: string;
-    subcat_1: string;
-    subcat_2: string;
-    subcat_3: string;
+// IMPORT JOB (Data received from /api/jobs/<id>)
+export interface ImportJob {
+    id: number;
+    kind: "import" | "product-import";
+    status: "queued" | "running" | "succeeded" | "failed";
+    snapshot: boolean;
+    total_rows: number;
+    next_row: number;
+    processed_rows: number;
+    error_count: number;
+    inserted_rows: number;
+    updated_rows: number;
+    unchanged_rows: number;
+    missing: { count: number; system_ids: string[] } | null;
+    message: string | null;
+    created_at: string;
+    started_at: string | null;
+    finished_at: string | null;
+    updated_at: string;
+    throughput_rows_per_sec: number | null;
+    progress: number | null;
+    errors: { row_idx: number; line: number | null; message: string }[];
 }
 
 
@@ -62,9 +53,29 @@ export interface ImportPayload {
 }
 
 
+// IMPORT ROW OUTCOME (Returned per payload row from /api/import)
+export interface ImportRowResult {
+    row: number;
+    upc: string | null;
+    status: "resolved" | "ambiguous" | "unmatched" | "invalid";
+    match?: "exact" | "normalized" | "substring" | null;
+    system_id?: string;
+    candidates?: string[];
+}
+
+
+// IMPORT RESPONSE (Data received from /api/import)
+export interface ImportResponse {
+    status: "success" | "error";
+    message: string;
+    summary?: Record<ImportRowResult["status"], number>;
+    results?: ImportRowResult[];
+}
+
+
 // LOOKUP RESULT (Data received from /api/lookup)
 export interface LookupResult {
-    // Product Fields (from ProductPayload structure)
+    // Product Fields (from products table)
     system_id: string;
     upc_id: string;
     description: string;
@@ -82,4 +93,4 @@ export interface LookupResult {
     shelf_id: string;
     shelf_row: string;
     item_position: number;
-}
\ No newline at end of file
+}